@@ -1,14 +1,33 @@
+// The snapshot is served next to this script, wherever the page itself is
+const SCRIPT_URL = document.currentScript ? document.currentScript.src : window.location.href;
+
 // Configuration
 const CONFIG = {
-    SHEET_URL: 'https://docs.google.com/spreadsheets/d/e/2PACX-1vSci-XCd0ne906VzOafwYm2k4P6i32G5dhZNUkvT0qxYGSmjOCpD5VIZ4rVB_fxuuNvBLjf8stmKbBu/pub?gid=0&single=true&output=tsv'
+    SHEET_URL: 'https://docs.google.com/spreadsheets/d/e/2PACX-1vSci-XCd0ne906VzOafwYm2k4P6i32G5dhZNUkvT0qxYGSmjOCpD5VIZ4rVB_fxuuNvBLjf8stmKbBu/pub?gid=0&single=true&output=tsv',
+    // Written by the scraper on every run, see scraper/utils/snapshot.py
+    MANIFEST_URL: new URL('data/manifest.json', SCRIPT_URL).href,
+    SNAPSHOT_VERSION: 2
 };
 
 let allDogs = [];
+let searchIndex = null;
+let shownDogs = [];
+let renderedCount = 0;
 
 const SMALL_WEIGHT_CUTOFF = 25;
 const MEDIUM_WEIGHT_CUTOFF = 50;
 const LARGE_WEIGHT_CUTOFF = 75;
 const FOSTER_MATCHING_URL = 'https://www.fidofostercommunity.org/fostermatchingform';
+// Thumbnail widths the scraper writes (scraper/utils/thumbnails.py), and how wide a card shows them
+const THUMBNAIL_WIDTHS = [400, 800];
+const THUMBNAIL_SIZES = '(max-width: 700px) 100vw, 400px';
+// Search matches words in these fields, tokenized the same way as scraper/utils/snapshot.py
+const SEARCH_FIELDS = ['Name', 'Breed', 'Description'];
+const TOKEN_PATTERN = /[a-z0-9]+/g;
+// Filter dropdown -> search index facet
+const FACET_FILTERS = [['gender', 'gender-filter'], ['weight', 'weight-filter'], ['rescue', 'rescue-filter']];
+// Cards added to the grid at a time, more are added as the end of the grid scrolls into view
+const RENDER_BATCH = 24;
 
 // Load and display dogs
 async function loadDogs() {
@@ -19,11 +38,9 @@ async function loadDogs() {
         loadingEl.style.display = 'block';
         errorEl.style.display = 'none';
 
-        const response = await fetch(CONFIG.SHEET_URL);
-        if (!response.ok) throw new Error('Failed to fetch data');
-
-        const csvText = await response.text();
-        allDogs = parseCSV(csvText);
+        const data = await fetchDogs();
+        allDogs = data.dogs;
+        searchIndex = prepareSearchIndex(data.index);
 
         populateFilters();
         displayDogs(allDogs);
@@ -37,6 +54,93 @@ async function loadDogs() {
     }
 }
 
+// Load the scraper's snapshot and its search index, falling back to the published sheet,
+// indexed here, if it isn't there
+async function fetchDogs() {
+    try {
+        return await fetchSnapshot();
+    } catch (error) {
+        console.warn('Dogs snapshot unavailable, loading the sheet instead:', error);
+    }
+
+    const response = await fetch(CONFIG.SHEET_URL);
+    if (!response.ok) throw new Error('Failed to fetch data');
+
+    const csvText = await response.text();
+    const dogs = parseCSV(csvText);
+    return { dogs, index: buildSearchIndex(dogs) };
+}
+
+// The small manifest is always revalidated. The snapshot url carries its hash, so the browser
+// can keep serving it from cache until the scraper writes a new one.
+async function fetchSnapshot() {
+    const manifestResponse = await fetch(CONFIG.MANIFEST_URL, { cache: 'no-cache' });
+    if (!manifestResponse.ok) throw new Error('Failed to fetch manifest');
+
+    const manifest = await manifestResponse.json();
+    if (manifest.version !== CONFIG.SNAPSHOT_VERSION) throw new Error(`Unknown snapshot version ${manifest.version}`);
+
+    const snapshotUrl = new URL(manifest.file, CONFIG.MANIFEST_URL);
+    snapshotUrl.searchParams.set('v', manifest.hash);
+    const snapshotResponse = await fetch(snapshotUrl, { cache: 'force-cache' });
+    if (!snapshotResponse.ok) throw new Error('Failed to fetch snapshot');
+
+    const snapshot = await snapshotResponse.json();
+    const dogs = snapshot.dogs.map(values => Object.fromEntries(snapshot.fields.map((field, index) => [field, values[index]])));
+    return { dogs, index: snapshot.index };
+}
+
+// Same index as build_search_index in scraper/utils/snapshot.py: term -> dog ids, plus the
+// dog ids for each gender, weight bucket and rescue. A dog's id is its position in allDogs.
+function buildSearchIndex(dogs) {
+    const index = { terms: {}, facets: { gender: {}, weight: {}, rescue: {} } };
+    const add = (lookup, key, id) => {
+        if (key) (lookup[key] = lookup[key] || []).push(id);
+    };
+
+    dogs.forEach((dog, id) => {
+        const text = SEARCH_FIELDS.map(field => dog[field] || '').join(' ').toLowerCase();
+        new Set(text.match(TOKEN_PATTERN)).forEach(term => add(index.terms, term, id));
+        add(index.facets.gender, dog.Gender, id);
+        add(index.facets.weight, weightBucket(dog.Weight), id);
+        add(index.facets.rescue, dog.Rescue_Name, id);
+    });
+
+    return index;
+}
+
+function weightBucket(weightText) {
+    const weight = parseInt(weightText);
+    if (isNaN(weight)) return '';
+    if (weight <= SMALL_WEIGHT_CUTOFF) return 'Small';
+    if (weight <= MEDIUM_WEIGHT_CUTOFF) return 'Medium';
+    if (weight <= LARGE_WEIGHT_CUTOFF) return 'Large';
+    return 'X-Large';
+}
+
+// Sorted terms let a search word match every term it is the start of with a binary search
+function prepareSearchIndex(index) {
+    return { ...index, sortedTerms: Object.keys(index.terms).sort() };
+}
+
+// Ids of the dogs with a term starting with prefix
+function dogIdsForPrefix(prefix) {
+    const terms = searchIndex.sortedTerms;
+    let low = 0;
+    let high = terms.length;
+    while (low < high) {
+        const middle = (low + high) >> 1;
+        if (terms[middle] < prefix) low = middle + 1;
+        else high = middle;
+    }
+
+    const ids = new Set();
+    for (let i = low; i < terms.length && terms[i].startsWith(prefix); i++) {
+        searchIndex.terms[terms[i]].forEach(id => ids.add(id));
+    }
+    return [...ids];
+}
+
 // Parse CSV data (now TSV format)
 function parseCSV(csv) {
     const lines = csv.split('\n');
@@ -59,33 +163,63 @@ function parseCSV(csv) {
     return dogs;
 }
 
-// Display dogs in grid
+// Display dogs in grid, only the first cards are built until the rest are scrolled to
 function displayDogs(dogs) {
     const gridEl = document.getElementById('dogs-grid');
+    shownDogs = dogs;
+    renderedCount = 0;
 
     if (dogs.length === 0) {
         gridEl.innerHTML = '<p style="text-align: center; width: 100%; padding: 40px;">No dogs found.</p>';
         return;
     }
 
-    gridEl.innerHTML = dogs.map(dog => createDogCard(dog)).join('');
+    gridEl.innerHTML = '';
+    renderMoreDogs();
+}
+
+function renderMoreDogs() {
+    const gridEl = document.getElementById('dogs-grid');
+    const batch = shownDogs.slice(renderedCount, renderedCount + RENDER_BATCH);
+    if (batch.length === 0) return;
+
+    gridEl.insertAdjacentHTML('beforeend', batch.map(dog => createDogCard(dog)).join(''));
+    renderedCount += batch.length;
+
+    const newCards = [...gridEl.children].slice(-batch.length);
+    requestAnimationFrame(() => hideUnnecessaryShowMoreButtons(newCards));
+
+    // Observe again so a grid end that is still in view asks for the next batch
+    moreDogsObserver.unobserve(moreDogsEl);
+    moreDogsObserver.observe(moreDogsEl);
+}
 
-    requestAnimationFrame(() => hideUnnecessaryShowMoreButtons());
+// Resized thumbnails from the snapshot when there are some, else the rescue's own image
+function createImageHTML(dog) {
+    if (!dog.Image_URL) return `<div class="dog-image placeholder">🐕</div>`;
+    if (!dog.Thumbnail) return `<img src="${dog.Image_URL}" alt="${dog.Name}" class="dog-image" loading="lazy">`;
+
+    const base = new URL(dog.Thumbnail, CONFIG.MANIFEST_URL).href;
+    const srcset = extension => THUMBNAIL_WIDTHS.map(width => `${base}-${width}.${extension} ${width}w`).join(', ');
+
+    return `
+        <picture>
+            <source type="image/webp" srcset="${srcset('webp')}" sizes="${THUMBNAIL_SIZES}">
+            <img src="${base}-${THUMBNAIL_WIDTHS[0]}.jpg" srcset="${srcset('jpg')}" sizes="${THUMBNAIL_SIZES}"
+                alt="${dog.Name}" class="dog-image" loading="lazy">
+        </picture>
+    `;
 }
 
 // Create HTML for dog card
 function createDogCard(dog) {
-    const imageHTML = dog.Image_URL
-        ? `<img src="${dog.Image_URL}" alt="${dog.Name}" class="dog-image">`
-        : `<div class="dog-image placeholder">🐕</div>`;
-
     return `
         <div class="dog-card">
-            ${imageHTML}
+            ${createImageHTML(dog)}
             <div class="dog-info">
                 <h2 class="dog-name">${dog.Name || 'Unknown'}</h2>
                 ${dog.Breed ? `<div class="dog-detail"><strong>Breed:</strong> ${dog.Breed}</div>` : ''}
-                ${dog.Age ? `<div class="dog-detail"><strong>Age:</strong> ${dog.Age}</div>` : ''}
+                ${dog.Age ? `<div class="dog-detail"><strong>Age:</strong> ${formatAge(dog.Age)}</div>` : ''}
                 ${dog.Gender ? `<div class="dog-detail"><strong>Gender:</strong> ${dog.Gender}</div>` : ''}
                 ${dog.Weight ? `<div class="dog-detail"><strong>Weight:</strong> ${dog.Weight} lbs</div>` : ''}
                 ${dog.Rescue_Name ? `<div class="dog-detail-underline"><strong>Rescue:</strong> ${dog.Rescue_Name}</div>` : ''}
@@ -97,6 +231,29 @@ function createDogCard(dog) {
     `;
 }
 
+// Some rescues store a birth date (YYYY-MM-DD) instead of an age, so it stays the same every day.
+// Work the age out from it as 'XY/XM/XD', anything else is shown as is.
+function formatAge(age) {
+    const match = /^(\d{4})-(\d{2})-(\d{2})$/.exec(age);
+    if (!match) return age;
+
+    const now = new Date();
+    let years = now.getFullYear() - Number(match[1]);
+    let months = now.getMonth() + 1 - Number(match[2]);
+    let days = now.getDate() - Number(match[3]);
+
+    if (days < 0) {
+        months -= 1;
+        days += new Date(now.getFullYear(), now.getMonth(), 0).getDate(); // Days in last month
+    }
+    if (months < 0) {
+        years -= 1;
+        months += 12;
+    }
+
+    return `${years}Y/${months}M/${days}D`;
+}
+
 // Populate filter dropdowns
 function populateFilters() {
     const rescueFilter = document.getElementById('rescue-filter');
@@ -110,50 +267,37 @@ function populateFilters() {
     });
 }
 
-// Filter dogs based on search and filters
+// Filter dogs by intersecting the dog ids of each chosen filter and search word
 function filterDogs() {
-    const genderFilter = document.getElementById('gender-filter').value
-    const searchTerm = document.getElementById('search').value.toLowerCase();
-    const weightFilter = document.getElementById('weight-filter').value;
-    const rescueFilter = document.getElementById('rescue-filter').value;
-
-    const filtered = allDogs.filter(dog => {
-        const matchesGender = !genderFilter || dog.Gender === genderFilter;
-
-        const matchesSearch = !searchTerm ||
-            dog.Name.toLowerCase().includes(searchTerm) ||
-            dog.Breed.toLowerCase().includes(searchTerm) ||
-            dog.Description.toLowerCase().includes(searchTerm);
-
-        const matchesRescue = !rescueFilter || dog.Rescue_Name === rescueFilter;
-
-        const weight = parseInt(dog.Weight)
-        let matchesWeight;
-        switch (weightFilter) {
-            case 'Small':
-                matchesWeight = weight <= SMALL_WEIGHT_CUTOFF;
-                break;
-            case 'Medium':
-                matchesWeight = weight <= MEDIUM_WEIGHT_CUTOFF && weight > SMALL_WEIGHT_CUTOFF;
-                break;
-            case 'Large':
-                matchesWeight = weight <= LARGE_WEIGHT_CUTOFF && weight > MEDIUM_WEIGHT_CUTOFF;
-                break;
-            case 'X-Large':
-                matchesWeight = weight > LARGE_WEIGHT_CUTOFF;
-                break;
-            default:
-                matchesWeight = true;
-                break;
-        }
+    const idLists = [];
 
-        return matchesGender && matchesSearch && matchesWeight && matchesRescue;
+    FACET_FILTERS.forEach(([facet, elementId]) => {
+        const value = document.getElementById(elementId).value;
+        if (value) idLists.push(searchIndex.facets[facet][value] || []);
     });
 
-    displayDogs(filtered);
+    const searchWords = document.getElementById('search').value.toLowerCase().match(TOKEN_PATTERN) || [];
+    searchWords.forEach(word => idLists.push(dogIdsForPrefix(word)));
+
+    if (idLists.length === 0) {
+        displayDogs(allDogs);
+        return;
+    }
+
+    // Walk the shortest list, checking the others
+    idLists.sort((a, b) => a.length - b.length);
+    const otherSets = idLists.slice(1).map(ids => new Set(ids));
+    const ids = idLists[0].filter(id => otherSets.every(idSet => idSet.has(id)));
+
+    displayDogs(ids.sort((a, b) => a - b).map(id => allDogs[id]));
 }
 
 // Event listeners
+const moreDogsEl = document.getElementById('dogs-more');
+const moreDogsObserver = new IntersectionObserver(entries => {
+    if (entries.some(entry => entry.isIntersecting)) renderMoreDogs();
+}, { rootMargin: '800px' });
+
 document.getElementById('gender-filter').addEventListener('change', filterDogs)
 document.getElementById('search').addEventListener('input', filterDogs);
 document.getElementById('weight-filter').addEventListener('change', filterDogs);
@@ -174,8 +318,8 @@ function toggleDescription(btn) {
     }
 }
 
-function hideUnnecessaryShowMoreButtons() {
-    document.querySelectorAll('.dog-description.truncated').forEach(desc => {
+function hideUnnecessaryShowMoreButtons(cards) {
+    cards.flatMap(card => [...card.querySelectorAll('.dog-description.truncated')]).forEach(desc => {
         const btn = desc.nextElementSibling;
         if (btn && btn.classList.contains('show-more-btn')) {
             // Check if content is actually truncated
@@ -0,0 +1,335 @@
+'''
+Time a whole scrape and sheet sync offline, with the replay fixtures scaled up to many dogs.
+
+Every rescue's recorded data is cloned, with unique names and ids, until the run scrapes about
+--dogs dogs. The scraper is then replayed three times against the same in-memory sheets:
+    cold   the Current sheet starts empty, so every dog is added
+    warm   nothing has changed since the cold run
+    churn  --churn of the rows look edited, as many are missing and as many are for dogs
+           that are gone, so each kind of sheet write happens
+Each run reports its wall time, Sheets API calls and HTTP requests. The sheets left by each run
+are checked by key: the cold run adds every dog once, the warm run changes nothing, and the
+churn run rewrites the edited rows, adds back the missing ones and archives the gone ones, with
+no other row added or lost. Any difference fails the run.
+
+Run from the scraper directory:
+    python -m benchmarks.end_to_end [--dogs 10000] [--churn 0.05]
+'''
+import argparse
+import copy
+import io
+import json
+import math
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+from urllib.parse import parse_qsl, urlsplit, urlunsplit
+
+import requests
+import scrape_dogs
+from benchmarks.replay import check_current, load_fixtures, replaying, row_key, rows_by_key
+from benchmarks.road_to_freedom import scale_page
+from bs4 import BeautifulSoup
+from utils.google_sheet import ARCHIVE_SHEET_NAME, CURRENT_SHEET_NAME, LOGS_SHEET_NAME
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'replay')
+MAIN_SHEET = 'Fido Foster Dogs Database - TEST'
+# Rescue spreadsheets, and the name that ends the rows read from each
+RESCUE_SHEETS = {
+    'TCF x Fido spreadsheet': 'DOGS IN SAN DIEGO',
+    'Mother of Dragons Foster Dog List': None,
+}
+
+def clone_name(name, i, original_count):
+    '''The originals keep their names, every copy gets a number.'''
+    return name if i < original_count else f'{name} {i}'
+
+def entries_for(http_entries, host):
+    return [entry for entry in http_entries if urlsplit(entry['url']).hostname == host]
+
+def scale_shelterluv(http_entries, factor):
+    '''Clone the recorded Shelterluv animals and page them again like the API would.'''
+    pages = entries_for(http_entries, 'new.shelterluv.com')
+    if not pages:
+        return http_entries
+
+    animals = [animal for page in pages for animal in json.loads(page['text'])['animals']]
+    count = round(len(animals) * factor)
+    clones = []
+    for i in range(count):
+        animal = dict(animals[i % len(animals)])
+        animal['Name'] = clone_name(animal['Name'], i, len(animals))
+        animal['Internal-ID'] = clone_name(animal['Internal-ID'], i, len(animals)).replace(' ', '-')
+        clones.append(animal)
+
+    url = urlsplit(pages[0]['url'])
+    base_url = urlunsplit(url._replace(query=''))
+    params = dict(parse_qsl(url.query))
+    page_size = int(params['limit'])
+
+    scaled = []
+    for offset in range(0, max(count, 1), page_size):
+        params['offset'] = str(offset)
+        has_more = offset + page_size < count
+        scaled.append(dict(
+            pages[0],
+            url=requests.Request('GET', base_url, params=params).prepare().url,
+            text=json.dumps({'success': 1, 'animals': clones[offset:offset + page_size],
+                             'has_more': has_more, 'total_count': count}),
+        ))
+
+    return [entry for entry in http_entries if entry not in pages] + scaled
+
+def scale_road_to_freedom(http_entries, factor):
+    for entry in entries_for(http_entries, 'roadtofreedomrescue.com'):
+        card_count = entry['text'].count('Bzl-dog-post')
+        entry['text'] = scale_page(entry['text'], round(card_count * factor))
+    return http_entries
+
+def scale_amazing_strays(http_entries, factor):
+    '''Clone the Monday.com board items, and the site's gallery items that go with them.'''
+    for entry in entries_for(http_entries, 'api.monday.com'):
+        data = json.loads(entry['text'])
+        board = data['data']['boards'][0]
+        items = list({
+            item['id']: item
+            for item in board['tempFostersGroup'][0]['items_page']['items'] + board['needsFoster']['items']
+        }.values())
+        count = round(len(items) * factor)
+        board['tempFostersGroup'][0]['items_page']['items'] = []
+        board['needsFoster']['items'] = [
+            {
+                'id': clone_name(items[i % len(items)]['id'], i, len(items)).replace(' ', '-'),
+                'name': clone_name(items[i % len(items)]['name'], i, len(items)),
+            }
+            for i in range(count)
+        ]
+        entry['text'] = json.dumps(data)
+
+    for entry in entries_for(http_entries, 'www.amazingstraysrescue.org'):
+        soup = BeautifulSoup(entry['text'], 'html.parser')
+        containers = [
+            title.find_parent('div', class_='gallery-item-container')
+            for title in soup.find_all('div', {'data-hook': 'item-title'})
+        ]
+        if not containers:
+            continue
+
+        gallery = containers[0].parent
+        for container in containers:
+            container.extract()
+
+        count = round(len(containers) * factor)
+        for i in range(count):
+            container = copy.copy(containers[i % len(containers)])
+            title = container.find('div', {'data-hook': 'item-title'})
+            title.string = clone_name(title.get_text(strip=True), i, len(containers))
+            gallery.append(container)
+        entry['text'] = str(soup)
+
+    return http_entries
+
+def scale_rows(values, factor, stop_at=None):
+    '''Clone the dog rows of a rescue sheet, renaming column A, keeping rows after stop_at.'''
+    names = [row[0] if row else '' for row in values]
+    end = names.index(stop_at) if stop_at in names else len(values)
+    rows = values[1:end]
+    count = round(len(rows) * factor)
+
+    clones = []
+    for i in range(count):
+        row = list(rows[i % len(rows)])
+        row[0] = clone_name(row[0], i, len(rows))
+        clones.append(row)
+    return values[:1] + clones + values[end:]
+
+def scale_fixtures(http_entries, sheets, factor):
+    '''
+    Returns:
+        tuple: (http entries, sheets) with every rescue's dogs cloned factor times over
+    '''
+    http_entries = copy.deepcopy(http_entries)
+    sheets = copy.deepcopy(sheets)
+
+    http_entries = scale_shelterluv(http_entries, factor)
+    http_entries = scale_road_to_freedom(http_entries, factor)
+    http_entries = scale_amazing_strays(http_entries, factor)
+    for title, stop_at in RESCUE_SHEETS.items():
+        if title in sheets:
+            worksheet = sheets[title]['worksheets'][0]
+            worksheet['values'] = scale_rows(worksheet['values'], factor, stop_at)
+
+    return http_entries, sheets
+
+def worksheet_values(sheets, title):
+    worksheets = sheets[MAIN_SHEET]['worksheets']
+    return next(worksheet for worksheet in worksheets if worksheet['title'] == title)['values']
+
+def current_values(sheets):
+    return worksheet_values(sheets, CURRENT_SHEET_NAME)
+
+def empty_current(sheets):
+    sheets = copy.deepcopy(sheets)
+    values = current_values(sheets)
+    del values[1:]
+    return sheets
+
+def churn_current(sheets, churn):
+    '''
+    Make churn of the Current rows look edited, drop as many, and add as many gone dogs.
+
+    Returns:
+        tuple: (sheets, churned), churned holding the 'edited', 'dropped' and 'gone' keys
+    '''
+    sheets = copy.deepcopy(sheets)
+    values = current_values(sheets)
+    churned = {'edited': set(), 'dropped': set(), 'gone': set()}
+    count = int((len(values) - 1) * churn)
+    if not count:
+        return sheets, churned
+
+    step = max((len(values) - 1) // (2 * count), 1)
+    picked = list(range(1, len(values), step))[:2 * count]
+    for row_index in picked[:count]:
+        values[row_index][11] = 'edited-elsewhere'
+        churned['edited'].add(row_key(values[row_index]))
+    for row_index in sorted(picked[count:], reverse=True):
+        churned['dropped'].add(row_key(values[row_index]))
+        del values[row_index]
+
+    template = values[1]
+    for i in range(count):
+        row = list(template)
+        row[0] = f'Adopted {i}'
+        row[8] = f'adopted-{i}'
+        values.append(row)
+        churned['gone'].add(row_key(row))
+    return sheets, churned
+
+def check_cold(before, after):
+    '''The cold run starts from an empty Current sheet, so every dog is added once and none archived.'''
+    problems = check_current(current_values(after))
+    if len(current_values(after)) < 2:
+        problems.append('cold run added no dogs')
+    for row in current_values(after)[1:]:
+        if str(row[10]).lower() != 'false' or not row[11]:
+            problems.append(f'{row_key(row)} was added without Manually_Edited false and a fingerprint')
+    if len(worksheet_values(after, ARCHIVE_SHEET_NAME)) != len(worksheet_values(before, ARCHIVE_SHEET_NAME)):
+        problems.append('cold run archived dogs')
+    return problems
+
+def check_warm(before, after):
+    '''Nothing was scraped differently, so the warm run leaves Current and Archive as they were.'''
+    problems = []
+    if current_values(after) != current_values(before):
+        problems.append('warm run changed the Current sheet')
+    if worksheet_values(after, ARCHIVE_SHEET_NAME) != worksheet_values(before, ARCHIVE_SHEET_NAME):
+        problems.append('warm run changed the Archive sheet')
+    return problems
+
+def check_churn(expected, before, after, churned):
+    '''
+    The churn run rewrites the edited rows, adds back the dropped ones and archives the gone
+    ones, unless their rescue's drop was held for review, and touches nothing else.
+
+    Args:
+        expected: Sheets after the warm run, which the churn run should get back to
+        before: Sheets the churn run started from
+        after: Sheets the churn run left
+        churned: Keys changed by churn_current
+    '''
+    problems = check_current(current_values(after))
+    expected_rows = rows_by_key(current_values(expected))
+    after_rows = rows_by_key(current_values(after))
+
+    new_logs = worksheet_values(after, LOGS_SHEET_NAME)[len(worksheet_values(before, LOGS_SHEET_NAME)):]
+    held = {json.loads(row[2]).get('Rescue_Name') for row in new_logs if row[1] == 'Large drop held for review'}
+    archived = churned['gone'] - {key for key in churned['gone'] if key[1] in held}
+    new_archive = worksheet_values(after, ARCHIVE_SHEET_NAME)[len(worksheet_values(before, ARCHIVE_SHEET_NAME)):]
+
+    for key in churned['edited']:
+        if key not in after_rows or after_rows[key][0][11] == 'edited-elsewhere':
+            problems.append(f'edited row {key} was not updated')
+        elif after_rows[key][0][:9] != expected_rows[key][0][:9]:
+            problems.append(f'edited row {key} was updated with the wrong values')
+    for key in churned['dropped']:
+        if key not in after_rows:
+            problems.append(f'dropped row {key} was not added back')
+    for key in archived:
+        if key in after_rows:
+            problems.append(f'gone row {key} is still in Current')
+    if set(after_rows) != set(expected_rows) | (churned['gone'] - archived):
+        missing = set(expected_rows) - set(after_rows)
+        extra = set(after_rows) - set(expected_rows) - churned['gone']
+        problems.append(f'churn run lost {len(missing)} rows and added {len(extra)} unexpected ones')
+    if sorted(row_key(row) for row in new_archive) != sorted(archived):
+        problems.append(f'churn run archived {len(new_archive)} rows, expected the {len(archived)} gone ones')
+    return problems
+
+def run(http_entries, sheets):
+    '''
+    Replay one scraper run.
+
+    Returns:
+        dict: 'seconds', 'sheets' (CallCounter summary), 'http' requests and the sheets after the run
+    '''
+    with replaying(http_entries, sheets) as client, redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        scrape_dogs.main([])
+        seconds = time.perf_counter() - start
+
+    return {
+        'seconds': seconds,
+        'sheets': client.counter.summary(),
+        'http': sum(client.http_calls.values()),
+        'after': client.dump(),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', default=FIXTURES, help='Directory holding http.json and sheets.json')
+    parser.add_argument('--dogs', type=int, default=10000, help='About how many dogs the scaled run scrapes')
+    parser.add_argument('--churn', type=float, default=0.05, help='Share of rows changed before the churn run')
+    args = parser.parse_args(argv)
+
+    http_entries, sheets = load_fixtures(args.fixtures)
+    if MAIN_SHEET not in sheets:
+        print(f'FAIL: {args.fixtures} has no recording of "{MAIN_SHEET}"')
+        return 1
+    sheets = empty_current(sheets)
+
+    # One unscaled run tells how many dogs the fixtures hold
+    base_dogs = len(current_values(run(http_entries, sheets)['after'])) - 1
+    if not base_dogs:
+        print(f'FAIL: replaying {args.fixtures} adds no dogs')
+        return 1
+    factor = math.ceil(args.dogs / base_dogs)
+    http_entries, sheets = scale_fixtures(http_entries, sheets, factor)
+
+    runs = {'cold': run(http_entries, sheets)}
+    runs['warm'] = run(http_entries, runs['cold']['after'])
+    churned_sheets, churned = churn_current(runs['warm']['after'], args.churn)
+    runs['churn'] = run(http_entries, churned_sheets)
+
+    problems = (
+        check_cold(sheets, runs['cold']['after']) +
+        check_warm(runs['cold']['after'], runs['warm']['after']) +
+        check_churn(runs['warm']['after'], churned_sheets, runs['churn']['after'], churned)
+    )
+
+    synced = len(current_values(runs['cold']['after'])) - 1
+    print(f'{synced} dogs synced ({base_dogs} in the fixtures, cloned {factor}x)')
+    print(f'{"run":<6} {"wall":>8} {"reads":>6} {"writes":>7} {"http":>5}  sheets calls by method')
+    for name, result in runs.items():
+        calls = result['sheets']
+        methods = ', '.join(f'{method} {count}' for method, count in sorted(calls['by_method'].items()))
+        print(f'{name:<6} {result["seconds"]:>7.2f}s {calls["reads"]:>6} {calls["writes"]:>7} {result["http"]:>5}  {methods}')
+
+    for problem in problems:
+        print(f'FAIL: {problem}')
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,267 @@
+'''
+In-memory stand-in for the parts of gspread the scraper uses.
+
+A FakeClient holds FakeSpreadsheets built from recorded sheet contents. Every call that would
+hit the Sheets or Drive API is counted, split into reads and writes, so a run can report how
+many API calls it would have made.
+'''
+from collections import Counter
+from types import SimpleNamespace
+
+import gspread
+from gspread.utils import ValueRenderOption, a1_range_to_grid_range, numericise_all, to_records
+
+
+class CallCounter:
+    '''Counts API calls by method, shared by a client and everything opened with it.'''
+
+    def __init__(self):
+        self.reads = Counter()
+        self.writes = Counter()
+
+    def read(self, method):
+        self.reads[method] += 1
+
+    def write(self, method):
+        self.writes[method] += 1
+
+    def summary(self):
+        return {
+            'reads': sum(self.reads.values()),
+            'writes': sum(self.writes.values()),
+            'by_method': dict(self.reads + self.writes),
+        }
+
+
+class FakeClient:
+    '''Stands in for an authorized gspread.Client.'''
+
+    def __init__(self, sheets, counter=None):
+        '''
+        Args:
+            sheets: Recorded sheets as saved by the replay harness,
+                    {title: {'id': key, 'worksheets': [{'title', 'id', 'values'}]}}
+        '''
+        self.counter = counter or CallCounter()
+        self.spreadsheets = {
+            title: FakeSpreadsheet(title, sheet['id'], sheet['worksheets'], self.counter)
+            for title, sheet in sheets.items()
+        }
+        self.http_client = SimpleNamespace(
+            auth=SimpleNamespace(service_account_email='replay', token=None, expiry=None)
+        )
+
+    def open(self, title):
+        # A Drive search plus the spreadsheet metadata
+        self.counter.read('open')
+        if title not in self.spreadsheets:
+            raise gspread.SpreadsheetNotFound(title)
+        return self.spreadsheets[title]
+
+    def open_by_key(self, key):
+        self.counter.read('open_by_key')
+        for spreadsheet in self.spreadsheets.values():
+            if spreadsheet.id == key:
+                return spreadsheet
+        raise gspread.SpreadsheetNotFound(key)
+
+    def dump(self):
+        '''Current contents of every sheet, in the same form the client was built from.'''
+        return {title: spreadsheet.dump() for title, spreadsheet in self.spreadsheets.items()}
+
+
+class FakeSpreadsheet:
+    def __init__(self, title, key, worksheets, counter):
+        self.title = title
+        self.id = key
+        self.counter = counter
+        self.revision = 0
+        self.worksheets_by_title = {
+            worksheet['title']: FakeWorksheet(self, worksheet['title'], worksheet['id'], worksheet['values'])
+            for worksheet in worksheets
+        }
+
+    @property
+    def sheet1(self):
+        self.counter.read('sheet1')
+        return next(iter(self.worksheets_by_title.values()))
+
+    def worksheet(self, title):
+        self.counter.read('worksheet')
+        if title not in self.worksheets_by_title:
+            raise gspread.WorksheetNotFound(title)
+        return self.worksheets_by_title[title]
+
+    def worksheets(self):
+        self.counter.read('worksheets')
+        return list(self.worksheets_by_title.values())
+
+    def get_lastUpdateTime(self):  # noqa: N802 (gspread's name)
+        # Drive's modifiedTime, any write moves it on
+        self.counter.read('get_lastUpdateTime')
+        return f'revision-{self.revision}'
+
+    def values_batch_get(self, ranges, params=None):
+        self.counter.read('values_batch_get')
+        params = params or {}
+        first = next(iter(self.worksheets_by_title.values()))
+
+        value_ranges = []
+        for name in ranges:
+            # Ranges without a sheet name are on the first sheet
+            title, _, cells = name.rpartition('!')
+            worksheet = self.worksheets_by_title[title.strip("'")] if title else first
+            values = worksheet.read_range(cells, params.get('valueRenderOption'))
+
+            if params.get('majorDimension') == 'COLUMNS':
+                width = max((len(row) for row in values), default=0)
+                values = [[row[j] if j < len(row) else '' for row in values] for j in range(width)]
+                for column in values:
+                    while column and column[-1] == '':
+                        column.pop()
+
+            value_range = {'range': name, 'majorDimension': params.get('majorDimension', 'ROWS')}
+            if values:
+                value_range['values'] = values
+            value_ranges.append(value_range)
+
+        return {'spreadsheetId': self.id, 'valueRanges': value_ranges}
+
+    def batch_update(self, body):
+        self.counter.write('batch_update')
+        self.revision += 1
+        by_id = {worksheet.id: worksheet for worksheet in self.worksheets_by_title.values()}
+
+        for request in body['requests']:
+            if 'appendCells' in request:
+                append = request['appendCells']
+                rows = [
+                    [next(iter(cell.get('userEnteredValue', {'stringValue': ''}).values())) for cell in row['values']]
+                    for row in append['rows']
+                ]
+                by_id[append['sheetId']].rows.extend(rows)
+            elif 'updateCells' in request:
+                update = request['updateCells']
+                start = update['start']
+                rows = [
+                    [next(iter(cell.get('userEnteredValue', {'stringValue': ''}).values())) for cell in row['values']]
+                    for row in update['rows']
+                ]
+                by_id[start['sheetId']].write_at(start['rowIndex'], start['columnIndex'], rows)
+            elif 'deleteDimension' in request:
+                grid = request['deleteDimension']['range']
+                if grid['dimension'] == 'ROWS':
+                    del by_id[grid['sheetId']].rows[grid['startIndex']:grid['endIndex']]
+            elif 'updateDimensionProperties' in request:
+                pass # Hiding rows or columns doesn't change any values
+            else:
+                raise NotImplementedError(f'FakeSpreadsheet can not apply {list(request)}')
+
+        return {'spreadsheetId': self.id, 'replies': [{} for _ in body['requests']]}
+
+    def dump(self):
+        return {
+            'id': self.id,
+            'worksheets': [
+                {'title': worksheet.title, 'id': worksheet.id, 'values': worksheet.rows}
+                for worksheet in self.worksheets_by_title.values()
+            ],
+        }
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title, sheet_id, values):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+        self.rows = [list(row) for row in values]
+
+    @property
+    def counter(self):
+        return self.spreadsheet.counter
+
+    def _changed(self, method):
+        self.counter.write(method)
+        self.spreadsheet.revision += 1
+
+    def read_range(self, name, value_render_option=None):
+        '''Values in an A1 range, trimmed of trailing empty cells and rows like the API does.'''
+        grid = a1_range_to_grid_range(name)
+        start_row = grid.get('startRowIndex', 0)
+        end_row = grid.get('endRowIndex', len(self.rows))
+        start_column = grid.get('startColumnIndex', 0)
+        end_column = grid.get('endColumnIndex')
+
+        values = []
+        for row in self.rows[start_row:end_row]:
+            cells = row[start_column:end_column]
+            if value_render_option != ValueRenderOption.unformatted:
+                cells = ['' if cell is None else str(cell) for cell in cells]
+            while cells and cells[-1] == '':
+                cells.pop()
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def get_all_values(self):
+        self.counter.read('get_all_values')
+        width = max((len(row) for row in self.rows), default=0)
+        return [[str(cell) for cell in row] + [''] * (width - len(row)) for row in self.rows]
+
+    def get_all_records(self):
+        self.counter.read('get_all_records')
+        width = max((len(row) for row in self.rows), default=0)
+        if not self.rows:
+            return []
+        rows = [[str(cell) for cell in row] + [''] * (width - len(row)) for row in self.rows]
+
+        duplicates = [header for header, count in Counter(rows[0]).items() if count > 1]
+        if duplicates:
+            raise gspread.exceptions.GSpreadException(
+                f'the header row in the worksheet contains duplicates: {duplicates}'
+            )
+        return to_records(rows[0], [numericise_all(row) for row in rows[1:]])
+
+    def batch_get(self, ranges, value_render_option=None, **kwargs):
+        self.counter.read('batch_get')
+        return [self.read_range(name, value_render_option) for name in ranges]
+
+    def _write(self, name, values):
+        grid = a1_range_to_grid_range(name)
+        self.write_at(grid.get('startRowIndex', 0), grid.get('startColumnIndex', 0), values)
+
+    def write_at(self, start_row, start_column, values):
+        '''Write rows of values from a 0-based cell, growing the sheet to fit.'''
+        for i, row in enumerate(values):
+            while len(self.rows) <= start_row + i:
+                self.rows.append([])
+            target = self.rows[start_row + i]
+            for j, value in enumerate(row):
+                while len(target) <= start_column + j:
+                    target.append('')
+                target[start_column + j] = value
+
+    def update(self, range_name=None, values=None, **kwargs):
+        self._changed('update')
+        self._write(range_name, values)
+
+    def batch_update(self, data, **kwargs):
+        self._changed('values_batch_update')
+        for value_range in data:
+            self._write(value_range['range'], value_range['values'])
+
+    def append_row(self, values, **kwargs):
+        self._changed('append_row')
+        self.rows.append(list(values))
+
+    def append_rows(self, values, **kwargs):
+        self._changed('append_rows')
+        self.rows.extend(list(row) for row in values)
+
+    def delete_rows(self, start_index, end_index=None):
+        self._changed('delete_rows')
+        del self.rows[start_index - 1:end_index or start_index]
+
+    def hide_columns(self, start, end):
+        self._changed('hide_columns')
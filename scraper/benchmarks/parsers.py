@@ -0,0 +1,379 @@
+'''
+Time every CPU-bound parser on synthetic inputs of 10, 1,000 and 100,000 dogs, and check the
+results against a stored baseline.
+
+Inputs are made up by seeded generators, so every run parses exactly the same data:
+    descriptions       free-text bios, through the shared description parser
+    road_to_freedom    a page of Bzl-dog-post cards, through parse_road_to_freedom
+    amazing_strays     a Wix gallery page and Monday.com board items, indexed and matched
+    paws_of_coronado   a Shelterluv animals response, filtered and turned into dogs
+    cantu_foundation   Cantu sheet records, turned into dogs
+    mother_of_dragons  Mother of Dragons sheet records, turned into dogs
+
+Each parser reports its best throughput in dogs per second and the peak Python memory of one
+run, as traced by tracemalloc (lxml's own C allocations aren't included). Throughput is also
+taken relative to a reference parser, the standard library's HTMLParser reading a page of
+REFERENCE_SIZE Road to Freedom cards, timed right after each parser so both run under the same
+load. Only that relative speed and the memory are kept in the baseline, so it holds on any
+machine. The run fails if a parser is more than --tolerance slower relative to the reference,
+or uses that much more memory, than the baseline. A baseline without relative speeds only
+checks memory.
+
+Run from the scraper directory:
+    python -m benchmarks.parsers [--sizes 10 1000] [--only descriptions] [--save-baseline]
+'''
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import timeit
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+
+import requests
+from rescues import amazing_strays, cantu_foundation, mother_of_dragons
+from rescues.paws_of_coronado_scraper import animal_to_dog, parse_animals_page
+from rescues.road_to_freedom import parse_road_to_freedom
+from utils.description_parser import description_parser
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'fixtures', 'parsers_baseline.json')
+DEFAULT_SIZES = [10, 1000, 100000]
+DEFAULT_TOLERANCE = 0.3
+# Memory this small is mostly noise, so it never counts as a regression
+MEMORY_SLACK_KB = 64
+SEED = 1234
+# Dogs on the page the reference parser reads
+REFERENCE_SIZE = 1000
+
+NAMES = ['Ellie', 'Bruno', 'Pickles', 'Hank', 'Georgie May', 'Biscuit', 'Luna', 'Max', 'Ruby',
+         'Pepper', 'Daisy', 'Cooper', 'Rosie', 'Tucker', 'Maple', 'Otis', 'Willow', 'Bear']
+BREEDS = ['Labrador Retriever Mix', 'Pit Bull Terrier', 'German Shepherd', 'Chihuahua Mix',
+          'Australian Cattle Dog', 'Husky', 'Boxer Mix', 'Beagle', 'Terrier Mix']
+NUMBER_WORDS = ['one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten']
+FILLER = [
+    'I love car rides & belly rubs!',
+    'She is good with other dogs and loves to play fetch in the yard.',
+    'He walks well on a leash and knows sit, down and shake.',
+    'Crate trained and house trained, a total couch potato once the zoomies are out.',
+    'Would do best in a home without cats.',
+    'Loves kids, squeaky toys and long naps in the sun.',
+]
+
+def make_description(rng, name):
+    '''A bio in one of the formats the description parser handles, padded out with filler.'''
+    gender = rng.choice(['female', 'male'])
+    pronoun = 'She' if gender == 'female' else 'He'
+    years = rng.randint(1, 12)
+    age = rng.choice([f'{years} year old', f'{rng.choice(NUMBER_WORDS)} year old',
+                      f'{rng.randint(2, 11)} month old', f'{rng.choice(NUMBER_WORDS)} and a half year old'])
+    weight = rng.choice([f'{rng.randint(8, 90)} pounds', f'{rng.randint(8, 90)} lbs'])
+    opening = rng.choice([
+        f'My name is {name}. I am a {age} {gender} who weighs {weight}.',
+        f'{name}, {age}, {gender}, {weight}.',
+        f'{name} is a {age} {gender}, about {weight}.',
+        f'{name} is a sweet pup. {pronoun} is {years} years old and {weight} of love.',
+    ])
+    return ' '.join([opening] + rng.sample(FILLER, 3))
+
+def make_descriptions(count, rng):
+    return [make_description(rng, rng.choice(NAMES)) for _ in range(count)]
+
+def make_road_to_freedom_page(count, rng):
+    '''A forever foster page with count dog cards, marked up like the real site.'''
+    cards = []
+    for i in range(count):
+        name = rng.choice(NAMES)
+        slug = f'{name.lower().replace(" ", "-")}-{i}'
+        gender = rng.choice(['female', 'male'])
+        cards.append(f'''<div class="col-md-4 Bzl-dog-post" data-name="{slug}">
+  <div class="Bzl-dog-img">
+    <a href="https://roadtofreedomrescue.com/dogs/{slug}/"><img src="https://roadtofreedomrescue.com/wp-content/uploads/2024/05/{slug}-300x300.jpg" alt="{name}" loading="lazy"></a>
+  </div>
+  <div class="Bzl-dog-heading">
+    <h3><a href="https://roadtofreedomrescue.com/dogs/{slug}/">
+      {name}
+    </a></h3>
+  </div>
+  <div class="Bzl-dog-meta">
+    <div class="row">
+      <div class="col-12"><i class="icon icon-dog-face"></i>
+        {rng.choice(BREEDS)}
+      </div>
+      <div class="col-12"><i class="icon icon-{gender}-sign"></i> {gender.capitalize()}</div>
+      <div class="col-12"><i class="icon icon-cake"></i>
+        {rng.randint(1, 12)} Years Old
+      </div>
+    </div>
+  </div>
+  <div class="Bzl-dog-description">
+    <p>{make_description(rng, name)}</p>
+    <p>Second paragraph is ignored.</p>
+  </div>
+</div>''')
+
+    return ('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Forever Foster Dogs</title></head>\n'
+            '<body>\n<div class="row">\n' + '\n'.join(cards) + '\n</div>\n</body></html>').encode('utf-8')
+
+def make_amazing_strays(count, rng):
+    '''
+    A Wix gallery page of count dogs and the Monday.com board items that list them.
+
+    One in ten board items isn't on the page, and a few are listed in both board groups.
+    '''
+    items = []
+    gallery = []
+    for i in range(count):
+        name = f'{rng.choice(NAMES)} {i}'
+        items.append({'id': str(5000000 + i), 'name': name})
+        if i % 10 == 9:
+            continue
+        gallery.append(f'''<div class="gallery-item-container" data-idx="{i}">
+  <div class="gallery-item-wrapper"><img data-hook="gallery-item-image-img" src="https://static.wixstatic.com/media/as_{i}.jpg" alt="{name}"></div>
+  <div class="info"><div data-hook="item-title">{name}</div><div data-hook="item-description">{make_description(rng, name)}</div></div>
+</div>''')
+    items.extend(items[:count // 20])
+
+    html = ('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Available Dogs | Amazing Strays</title></head>\n'
+            '<body>\n<div class="gallery">\n' + '\n'.join(gallery) + '\n</div>\n</body></html>')
+    return items, html.encode('utf-8')
+
+def make_shelterluv_response(count, rng):
+    '''A Shelterluv animals response of count animals, about a fifth of them not foster dogs.'''
+    animals = []
+    for i in range(count):
+        name = rng.choice(NAMES)
+        animals.append({
+            'Internal-ID': str(200000 + i),
+            'ID': f'PAWS-A-{i}',
+            'Name': name,
+            'Type': 'Cat' if i % 10 == 3 else 'Dog',
+            'Status': 'Adopted' if i % 10 == 7 else 'Available In-Shelter',
+            'InFoster': i % 20 == 11,
+            'Sex': rng.choice(['Male', 'Female']),
+            'Breed': rng.choice(BREEDS),
+            'DOBUnixTime': rng.randint(1262304000, 1704067200),
+            'CurrentWeightPounds': f'{rng.randint(5, 90)}.{rng.randint(0, 9)}',
+            'Description': make_description(rng, name).replace('. ', '.\n', 1),
+            'CoverPhoto': f'https://www.shelterluv.com/sites/default/files/animal_pics/1523/{200000 + i}_cover.jpg',
+            'Photos': [],
+            'Attributes': [],
+        })
+
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps({'success': 1, 'has_more': False, 'total_count': count, 'animals': animals}).encode('utf-8')
+    return response
+
+def make_cantu_rows(count, rng):
+    '''Cantu sheet records as read_sheet_records returns them, some with a foster lined up.'''
+    return [
+        {
+            cantu_foundation.NAME_HEADER: f'{rng.choice(NAMES)} {i}',
+            'Breed': rng.choice(BREEDS),
+            'Age ': rng.randint(1, 12),
+            'Gender': rng.choice(['Male', 'Female']),
+            'Weight': rng.randint(8, 90),
+            'Fur Color': rng.choice(['Black', 'Brown', 'Brindle', 'White', 'Tan']),
+            'Image': f'https://drive.google.com/uc?id=cantu{i}',
+            'Foster lined up': 'Yes' if i % 4 == 0 else '',
+            'Notes for website ': make_description(rng, 'This pup') if i % 8 != 1 else '',
+        }
+        for i in range(count)
+    ]
+
+def make_mother_of_dragons_rows(count, rng):
+    '''Mother of Dragons sheet records as read_sheet_records returns them.'''
+    return [
+        {
+            'Name': f'{rng.choice(NAMES)} {i}',
+            'Breed': rng.choice(BREEDS),
+            'Age': f'{rng.randint(1, 12)} years',
+            'Gender': rng.choice(['Male', 'Female']),
+            'Weight': rng.randint(8, 90),
+            'Description / Bio': make_description(rng, 'This pup').replace('. ', '.\n'),
+            'Image': f'https://drive.google.com/uc?id=mod{i}',
+        }
+        for i in range(count)
+    ]
+
+def parse_amazing_strays(data):
+    items, html = data
+    # Items missing from the page are printed, which isn't what's being timed
+    with redirect_stdout(io.StringIO()):
+        return amazing_strays.items_to_dogs(items, amazing_strays.build_dog_index(html))
+
+class CardCounter(HTMLParser):
+    '''Collects the data-name of every dog card, the reference work parsers are timed against.'''
+
+    def reset(self):
+        super().reset()
+        self.cards = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if 'Bzl-dog-post' in (attrs.get('class') or ''):
+            self.cards.append(attrs.get('data-name'))
+
+def reference_parse(html):
+    counter = CardCounter()
+    counter.feed(html)
+    counter.close()
+    return counter.cards
+
+# Parser name -> (input generator, parser returning the dogs it found)
+PARSERS = {
+    'descriptions': (make_descriptions, description_parser.parse_many),
+    'road_to_freedom': (make_road_to_freedom_page, parse_road_to_freedom),
+    'amazing_strays': (make_amazing_strays, parse_amazing_strays),
+    'paws_of_coronado': (make_shelterluv_response,
+                         lambda response: [animal_to_dog(animal) for animal in parse_animals_page(response)['animals']]),
+    'cantu_foundation': (make_cantu_rows, cantu_foundation.rows_to_dogs),
+    'mother_of_dragons': (make_mother_of_dragons_rows, mother_of_dragons.rows_to_dogs),
+}
+
+def measure(parse, data, count, repeat, reference=None):
+    '''
+    Time a parser on one input and trace its memory.
+
+    Small inputs are parsed in a loop long enough to time reliably, and the best of repeat
+    timings is kept. With a reference, each timing is followed by one of the reference parser,
+    so both see the same load on the machine, and the best ratio of the two is kept.
+
+    Returns:
+        dict: 'dogs' parsed, 'per_second' dogs and 'peak_kb' of Python memory, and the
+            'relative' speed with a reference
+    '''
+    timer = timeit.Timer(lambda: parse(data))
+    number, _ = timer.autorange()
+    if reference:
+        reference_number, _ = reference.autorange()
+
+    timings = []
+    relatives = []
+    for _ in range(repeat):
+        seconds = timer.timeit(number) / number
+        timings.append(seconds)
+        if reference:
+            reference_seconds = reference.timeit(reference_number) / reference_number
+            relatives.append((count / seconds) / (REFERENCE_SIZE / reference_seconds))
+
+    tracemalloc.start()
+    try:
+        dogs = parse(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result = {
+        'dogs': len(dogs),
+        'per_second': round(count / min(timings), 1),
+        'peak_kb': round(peak / 1024, 1),
+    }
+    if reference:
+        result['relative'] = round(max(relatives), 4)
+    return result
+
+def reference_timer():
+    '''A timer of the reference parser, which every parser's speed is taken relative to.'''
+    html = make_road_to_freedom_page(REFERENCE_SIZE, random.Random(SEED)).decode('utf-8')
+    return timeit.Timer(lambda: reference_parse(html))
+
+def find_regressions(results, baseline, tolerance):
+    '''
+    Compare results against a baseline, both parser -> size -> measure() result with the
+    'relative' speed added.
+
+    Parsers and sizes missing from the baseline are skipped, and so is the speed of a
+    baseline entry without a relative speed.
+
+    Returns:
+        list: A message for each regression
+    '''
+    regressions = []
+    for name, sizes in results.items():
+        for size, result in sizes.items():
+            expected = baseline.get(name, {}).get(size)
+            if not expected:
+                continue
+            if 'relative' in expected and result['relative'] < expected['relative'] * (1 - tolerance):
+                regressions.append(f'{name} at {size} dogs: {result["relative"]:.3f}x the reference speed, '
+                                   f'baseline {expected["relative"]:.3f}x')
+            if result['peak_kb'] > max(expected['peak_kb'] * (1 + tolerance), expected['peak_kb'] + MEMORY_SLACK_KB):
+                regressions.append(f'{name} at {size} dogs: {result["peak_kb"]:,.0f} KB peak, '
+                                   f'baseline {expected["peak_kb"]:,.0f}')
+    return regressions
+
+def load_baseline(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)['parsers']
+    except (OSError, ValueError, KeyError):
+        return {}
+
+def save_baseline(path, results):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'generated': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'python': sys.version.split()[0],
+            'parsers': results,
+        }, f, indent=1)
+        f.write('\n')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Numbers of dogs to parse')
+    parser.add_argument('--only', nargs='+', choices=list(PARSERS), help='Only run these parsers')
+    parser.add_argument('--repeat', type=int, default=3, help='Timings per input, the best one is kept')
+    parser.add_argument('--baseline', default=BASELINE, help='Baseline file to compare against')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='How much slower, or larger, than the baseline still passes')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Write the results to the baseline file instead of comparing')
+    args = parser.parse_args(argv)
+
+    reference = reference_timer()
+
+    results = {}
+    print(f'{"parser":<18} {"dogs":>7} {"parsed":>7} {"dogs/s":>12} {"relative":>9} {"peak KB":>10}')
+    for name in args.only or PARSERS:
+        make_input, parse = PARSERS[name]
+        results[name] = {}
+        for size in args.sizes:
+            data = make_input(size, random.Random(SEED))
+            result = measure(parse, data, size, args.repeat, reference)
+            # JSON keys are strings, so sizes are too
+            results[name][str(size)] = result
+            print(f'{name:<18} {size:>7} {result["dogs"]:>7} {result["per_second"]:>12,.0f} '
+                  f'{result["relative"]:>8.3f}x {result["peak_kb"]:>10,.0f}')
+
+    if args.save_baseline:
+        # Keep the baseline of parsers and sizes that weren't run this time. Dogs per second
+        # only hold on this machine, so they aren't saved
+        baseline = load_baseline(args.baseline)
+        for name, sizes in results.items():
+            for size, result in sizes.items():
+                baseline.setdefault(name, {})[size] = {key: value for key, value in result.items() if key != 'per_second'}
+        save_baseline(args.baseline, baseline)
+        print(f'Baseline saved to {args.baseline}')
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if not baseline:
+        print(f'No baseline at {args.baseline}, run with --save-baseline to make one')
+        return 0
+
+    regressions = find_regressions(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f'REGRESSION: {regression}')
+    if regressions:
+        return 1
+    print(f'No regressions past {args.tolerance:.0%} of the baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
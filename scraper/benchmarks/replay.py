@@ -0,0 +1,425 @@
+'''
+Record a scraper run into fixtures, or replay one offline against them.
+
+Record mode runs the scraper for real, saving every HTTP response and the starting contents of
+every spreadsheet it opens. Sheet writes are never sent, they land in an in-memory copy, so
+recording is safe against any sheet. Replay mode answers HTTP requests from the recording and
+serves the sheets from benchmarks.fake_sheets, then prints how many API calls the run made and
+fails if the run left the Current sheet with a row missing its key or a dog listed twice.
+
+Overlap mode checks that two --only syncs of different rescues can share one sheet. Both
+rescues' rows are interleaved with each other and another rescue's, with some to update and
+some to archive, then the first rescue is synced with the second one's whole sync run just
+before each of its Sheets reads in turn. Every time the sheet must end up as it does when the
+two run one after the other.
+
+Run from the scraper directory, anything after the fixtures directory goes to scrape_dogs:
+    python -m benchmarks.replay record benchmarks/fixtures/replay [--only road_to_freedom]
+    python -m benchmarks.replay replay benchmarks/fixtures/replay
+    python -m benchmarks.replay overlap benchmarks/fixtures/replay
+'''
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from benchmarks.fake_sheets import CallCounter, FakeClient, FakeSpreadsheet
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from utils import google_sheet
+
+# Google's own traffic is the Sheets API, which is recorded as sheet contents instead
+GOOGLE_HOSTS = ('googleapis.com', 'accounts.google.com')
+# The recorded body is already decoded and complete
+DROPPED_HEADERS = ('content-encoding', 'transfer-encoding', 'content-length')
+# Rescues the overlap check syncs over each other, the second during the first
+OVERLAP_RESCUES = ('cantu_foundation', 'road_to_freedom')
+# Rescue with rows in the sheet that neither overlapping sync may touch
+OTHER_RESCUE = 'Another Rescue'
+# Last_Updated is the time of the run, so it differs between runs making the same changes
+LAST_UPDATED_COLUMN = 9
+SEED = 1234
+# Settings that would let a run skip work or touch real files
+CLEARED_ENV = ('SCRAPER_HTTP_CACHE', 'SCRAPER_STATE_DB', 'GOOGLE_SHEETS_CACHE', 'SCRAPER_SNAPSHOT_DIR',
+               'SCRAPER_THUMBNAIL_DIR', 'SCRAPER_METRICS_FILE', 'SCRAPER_METRICS_LOG')
+
+def request_key(method, url, body):
+    '''Identify a request by method, full url and a hash of its body.'''
+    return f'{method} {url} {hashlib.sha256(_body_bytes(body)).hexdigest()}'
+
+def load_fixtures(directory):
+    '''
+    Returns:
+        tuple: (http entries, sheets) as saved by save_fixtures
+    '''
+    with open(os.path.join(directory, 'http.json'), encoding='utf-8') as f:
+        http_entries = json.load(f)
+    with open(os.path.join(directory, 'sheets.json'), encoding='utf-8') as f:
+        sheets = json.load(f)
+    return http_entries, sheets
+
+def save_fixtures(directory, http_entries, sheets):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'http.json'), 'w', encoding='utf-8') as f:
+        json.dump(http_entries, f, indent=1)
+    with open(os.path.join(directory, 'sheets.json'), 'w', encoding='utf-8') as f:
+        json.dump(sheets, f, indent=1)
+
+def encode_response(request, response):
+    '''Turn a live response into a JSON friendly http entry.'''
+    entry = {
+        'method': request.method,
+        'url': request.url,
+        'body_sha256': hashlib.sha256(_body_bytes(request.body)).hexdigest(),
+        'status': response.status_code,
+        'headers': {
+            name: value for name, value in response.headers.items()
+            if name.lower() not in DROPPED_HEADERS
+        },
+    }
+    try:
+        entry['text'] = response.content.decode('utf-8')
+    except UnicodeDecodeError:
+        entry['base64'] = base64.b64encode(response.content).decode('ascii')
+    return entry
+
+def decode_response(request, entry):
+    '''Build the requests.Response a recorded http entry stands for.'''
+    response = requests.Response()
+    response.status_code = entry['status']
+    response.headers = CaseInsensitiveDict(entry['headers'])
+    if 'base64' in entry:
+        response._content = base64.b64decode(entry['base64'])
+    else:
+        response._content = entry['text'].encode('utf-8')
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.reason = requests.status_codes._codes.get(entry['status'], ('',))[0].upper()
+    return response
+
+def _body_bytes(body):
+    if isinstance(body, str):
+        return body.encode('utf-8')
+    return body or b''
+
+@contextmanager
+def _patched(target, name, value):
+    original = getattr(target, name)
+    setattr(target, name, value)
+    try:
+        yield
+    finally:
+        setattr(target, name, original)
+
+@contextmanager
+def _isolated_env(**overrides):
+    saved = dict(os.environ)
+    for name in CLEARED_ENV:
+        os.environ.pop(name, None)
+    os.environ.update(overrides)
+    # Nothing opened before, or by, this run may leak into the next one
+    google_sheet._client = None
+    google_sheet._spreadsheets.clear()
+    try:
+        yield
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+        google_sheet._client = None
+        google_sheet._spreadsheets.clear()
+
+class RecordingClient:
+    '''
+    Wraps a real gspread client. Each spreadsheet opened is snapshotted, then served from a
+    FakeClient so the run's writes never reach the real sheet.
+    '''
+
+    def __init__(self, client, sheets):
+        self.client = client
+        self.fake = FakeClient({})
+        self.sheets = sheets
+        self.http_client = client.http_client
+
+    def open(self, title):
+        if title not in self.sheets:
+            self._snapshot(self.client.open(title))
+        return self.fake.open(title)
+
+    def open_by_key(self, key):
+        for title, sheet in self.sheets.items():
+            if sheet['id'] == key:
+                return self.fake.open(title)
+        spreadsheet = self.client.open_by_key(key)
+        self._snapshot(spreadsheet)
+        return self.fake.open(spreadsheet.title)
+
+    def _snapshot(self, spreadsheet):
+        sheet = {
+            'id': spreadsheet.id,
+            'worksheets': [
+                {'title': worksheet.title, 'id': worksheet.id, 'values': worksheet.get_all_values()}
+                for worksheet in spreadsheet.worksheets()
+            ],
+        }
+        self.sheets[spreadsheet.title] = sheet
+        self.fake.spreadsheets[spreadsheet.title] = FakeSpreadsheet(
+            spreadsheet.title, sheet['id'], json.loads(json.dumps(sheet['worksheets'])), self.fake.counter
+        )
+
+@contextmanager
+def recording():
+    '''
+    Record a run made inside the block.
+
+    Yields:
+        dict: 'http', the recorded http entries, and 'sheets', filled in as sheets are opened
+    '''
+    recorded = {'http': [], 'sheets': {}}
+    send = HTTPAdapter.send
+    get_client = google_sheet.get_google_client
+    recorders = []
+    lock = threading.Lock()
+
+    def record_send(adapter, request, **kwargs):
+        response = send(adapter, request, **kwargs)
+        if not urlsplit(request.url).hostname.endswith(GOOGLE_HOSTS):
+            recorded['http'].append(encode_response(request, response))
+        return response
+
+    def get_recording_client():
+        client = get_client()
+        with lock:
+            if not recorders:
+                recorders.append(RecordingClient(client, recorded['sheets']))
+        return recorders[0]
+
+    with _isolated_env(), \
+            _patched(HTTPAdapter, 'send', record_send), \
+            _patched(google_sheet, 'get_google_client', get_recording_client):
+        yield recorded
+
+@contextmanager
+def replaying(http_entries, sheets, counter=None):
+    '''
+    Replay recorded fixtures for a run made inside the block.
+
+    Yields:
+        FakeClient: The client the run's sheets come from. Its counter counts Sheets calls
+                    and http_calls counts replayed requests by host
+    '''
+    responses = {f'{entry["method"]} {entry["url"]} {entry["body_sha256"]}': entry for entry in http_entries}
+    client = FakeClient(json.loads(json.dumps(sheets)), counter or CallCounter())
+    client.http_calls = Counter()
+
+    def replay_send(adapter, request, **kwargs):
+        entry = responses.get(request_key(request.method, request.url, request.body))
+        if entry is None:
+            raise requests.ConnectionError(f'No recorded response for {request.method} {request.url}')
+        client.http_calls[urlsplit(request.url).hostname] += 1
+        return decode_response(request, entry)
+
+    with _isolated_env(PAWS_OF_CORONADO_TOKEN='replay', AMAZING_STRAYS_TOKEN='replay'), \
+            _patched(HTTPAdapter, 'send', replay_send), \
+            _patched(google_sheet, 'get_google_client', lambda: client):
+        yield client
+
+def row_key(row):
+    '''(Their_Id, Rescue_Name) of a Current or Archive row.'''
+    row = list(row) + [''] * (9 - len(row))
+    return (str(row[8]), str(row[7]))
+
+def rows_by_key(values):
+    '''Rows below the header, key -> list of the rows with that key.'''
+    rows = {}
+    for row in values[1:]:
+        rows.setdefault(row_key(row), []).append(row)
+    return rows
+
+def check_current(values):
+    '''Problems with the Current sheet every run must avoid: rows without a key, or duplicated.'''
+    problems = []
+    for key, rows in rows_by_key(values).items():
+        if not all(key):
+            problems.append(f'{len(rows)} Current rows without a Their_Id or Rescue_Name')
+        elif len(rows) > 1:
+            problems.append(f'{key} is in Current {len(rows)} times')
+    return problems
+
+def check_sheets(sheets):
+    '''check_current() for the Current sheet of every spreadsheet that has one.'''
+    problems = []
+    for title, spreadsheet in sheets.items():
+        for worksheet in spreadsheet['worksheets']:
+            if worksheet['title'] == google_sheet.CURRENT_SHEET_NAME:
+                problems += [f'{title}: {problem}' for problem in check_current(worksheet['values'])]
+    return problems
+
+class InterruptingCounter(CallCounter):
+    '''Counts calls like CallCounter, and runs interrupt just before the nth read.'''
+
+    def __init__(self, n, interrupt):
+        super().__init__()
+        self.n = n
+        self.interrupt = interrupt
+        self.seen = 0
+        self.interrupted = None
+
+    def read(self, method):
+        self.seen += 1
+        if self.seen == self.n:
+            self.interrupted = method
+            self.interrupt()
+        super().read(method)
+
+def current_of(sheets):
+    '''The values of the Current sheet in recorded sheets, changes to them change the sheets.'''
+    for spreadsheet in sheets.values():
+        for worksheet in spreadsheet['worksheets']:
+            if worksheet['title'] == google_sheet.CURRENT_SHEET_NAME:
+                return worksheet['values']
+    raise ValueError('No Current sheet in the fixtures')
+
+def sheet_contents(sheets):
+    '''
+    The rows of every worksheet, sorted and without Last_Updated, to compare runs with.
+
+    Returns:
+        dict: (spreadsheet title, worksheet title) -> sorted rows as tuples of strings
+    '''
+    contents = {}
+    for title, spreadsheet in sheets.items():
+        for worksheet in spreadsheet['worksheets']:
+            rows = []
+            for row in worksheet['values']:
+                cells = [str(cell) for idx, cell in enumerate(row) if idx != LAST_UPDATED_COLUMN]
+                while cells and cells[-1] == '':
+                    cells.pop()
+                rows.append(tuple(cells))
+            contents[(title, worksheet['title'])] = sorted(rows)
+    return contents
+
+def overlap_sheets(http_entries, sheets):
+    '''
+    Recorded sheets with rows of both OVERLAP_RESCUES, some to update and some to archive,
+    shuffled in among each other and the rows of OTHER_RESCUE.
+    '''
+    import scrape_dogs
+
+    with replaying(http_entries, sheets) as client:
+        scrape_dogs.main(['--only', *OVERLAP_RESCUES])
+    sheets = client.dump()
+    values = current_of(sheets)
+
+    rows = []
+    for rescue_rows in rows_by_rescue(values[1:]).values():
+        for idx, row in enumerate(rescue_rows):
+            row = list(row)
+            if idx < 2:
+                # A fingerprint that matches nothing makes the dog an update
+                row[11] = 'changed-changed'
+            rows.append(row)
+        for i in range(2):
+            gone = list(rescue_rows[i])
+            gone[8] = f'gone-{i}'
+            rows.append(gone)
+            other = list(rescue_rows[i])
+            other[7] = OTHER_RESCUE
+            rows.append(other)
+
+    random.Random(SEED).shuffle(rows)
+    values[1:] = rows
+    return sheets
+
+def rows_by_rescue(rows):
+    '''Rows grouped by Rescue_Name, in sheet order.'''
+    rescues = {}
+    for row in rows:
+        rescues.setdefault(row_key(row)[1], []).append(row)
+    return rescues
+
+def check_overlap(http_entries, sheets):
+    '''
+    Sync the first of OVERLAP_RESCUES with the second's sync run just before each of its
+    Sheets reads, and compare each result with the two synced one after the other.
+
+    Returns:
+        list: Problems, one for each read where the sheet ended up different
+    '''
+    import scrape_dogs
+
+    first, second = (['--only', rescue] for rescue in OVERLAP_RESCUES)
+    sheets = overlap_sheets(http_entries, sheets)
+
+    with replaying(http_entries, sheets) as client:
+        scrape_dogs.main(first)
+        reads = sum(client.counter.reads.values())
+        scrape_dogs.main(second)
+    expected = sheet_contents(client.dump())
+
+    problems = []
+    for n in range(1, reads + 1):
+        counter = InterruptingCounter(n, lambda: scrape_dogs.main(second))
+        with replaying(http_entries, sheets, counter) as client:
+            scrape_dogs.main(first)
+        contents = sheet_contents(client.dump())
+        for key in expected:
+            if contents[key] != expected[key]:
+                problems.append(f'{key[1]} differs when {OVERLAP_RESCUES[1]} synced before '
+                                f'{OVERLAP_RESCUES[0]}\'s read {n} ({counter.interrupted})')
+        problems += [f'after read {n}: {problem}' for problem in check_sheets(client.dump())]
+
+    print(f'Synced {OVERLAP_RESCUES[1]} before each of {reads} reads of a {OVERLAP_RESCUES[0]} sync')
+    return problems
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mode', choices=['record', 'replay', 'overlap'])
+    parser.add_argument('fixtures', help='Directory holding http.json and sheets.json')
+    args, scrape_args = parser.parse_known_args(argv)
+
+    import scrape_dogs
+
+    if args.mode == 'record':
+        with recording() as recorded:
+            scrape_dogs.main(scrape_args)
+        save_fixtures(args.fixtures, recorded['http'], recorded['sheets'])
+        print(f'Recorded {len(recorded["http"])} responses and {len(recorded["sheets"])} sheets to {args.fixtures}')
+        return 0
+
+    http_entries, sheets = load_fixtures(args.fixtures)
+    if args.mode == 'overlap':
+        problems = check_overlap(http_entries, sheets)
+        for problem in problems:
+            print(f'FAIL: {problem}')
+        return 1 if problems else 0
+
+    with replaying(http_entries, sheets) as client:
+        scrape_dogs.main(scrape_args)
+
+    calls = client.counter.summary()
+    print(f'Sheets API calls: {calls["reads"]} reads, {calls["writes"]} writes')
+    for method, count in sorted(calls['by_method'].items()):
+        print(f'  {method}: {count}')
+    print(f'HTTP requests: {sum(client.http_calls.values())}')
+    for host, count in sorted(client.http_calls.items()):
+        print(f'  {host}: {count}')
+
+    # Only what the run did counts, not rows the recorded sheet already had
+    already = set(check_sheets(sheets))
+    problems = [problem for problem in check_sheets(client.dump()) if problem not in already]
+    for problem in problems:
+        print(f'FAIL: {problem}')
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+'''
+Check the fast Road To Freedom extraction against the fixture and time it against the full
+page parse on a page scaled up to thousands of dog cards.
+
+Run from the scraper directory:
+    python -m benchmarks.road_to_freedom [--cards 3000]
+'''
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+from rescues import road_to_freedom
+from rescues.road_to_freedom import parse_road_to_freedom
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+CARD_PATTERN = re.compile(r'<div class="col-md-4 Bzl-dog-post".*?\n</div>\n', re.DOTALL)
+
+def load_fixture():
+    with open(os.path.join(FIXTURES, 'road_to_freedom.html'), encoding='utf-8') as f:
+        html = f.read()
+    with open(os.path.join(FIXTURES, 'road_to_freedom.json'), encoding='utf-8') as f:
+        expected = json.load(f)
+    return html, expected
+
+def scale_page(html, card_count):
+    '''Repeat the fixture's dog cards, with unique ids, until the page has card_count cards.'''
+    cards = CARD_PATTERN.findall(html)
+    start = html.index(cards[0])
+    end = html.index(cards[-1]) + len(cards[-1])
+
+    scaled = []
+    for i in range(card_count):
+        card = cards[i % len(cards)]
+        scaled.append(card.replace('data-name="', f'data-name="{i}-', 1).replace('/dogs/', f'/dogs/{i}-'))
+
+    return html[:start] + '\n'.join(scaled) + html[end:]
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, default=3000, help='Number of dog cards in the scaled page')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per mode, the best one is reported')
+    args = parser.parse_args(argv)
+
+    html, expected = load_fixture()
+    encoded = html.encode('utf-8')
+
+    # Both modes must return exactly what the fixture expects
+    for fast in (False, True):
+        if parse_road_to_freedom(encoded, fast=fast) != expected:
+            print(f'FAIL: fast={fast} does not match fixtures/road_to_freedom.json')
+            return 1
+    print(f'Fixture matches in both modes ({len(expected)} dogs, lxml: {road_to_freedom.lxml is not None})')
+
+    scaled = scale_page(html, args.cards).encode('utf-8')
+    full_dogs = parse_road_to_freedom(scaled, fast=False)
+    fast_dogs = parse_road_to_freedom(scaled, fast=True)
+    if full_dogs != fast_dogs or len(fast_dogs) != args.cards:
+        print(f'FAIL: modes disagree on the scaled page ({len(full_dogs)} vs {len(fast_dogs)} dogs)')
+        return 1
+
+    full_time = best_time(lambda: parse_road_to_freedom(scaled, fast=False), args.repeat)
+    fast_time = best_time(lambda: parse_road_to_freedom(scaled, fast=True), args.repeat)
+
+    print(f'{args.cards} cards, {len(scaled) / 1024:.0f} KB page')
+    print(f'  full page parse: {full_time:.3f}s')
+    print(f'  fast extraction: {fast_time:.3f}s')
+    print(f'  speedup: {full_time / fast_time:.1f}x')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
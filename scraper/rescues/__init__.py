@@ -1 +1,70 @@
 # Rescue scrapers module
+#
+# Every rescue source is a function that takes no arguments and returns a source_result
+# (utils.fetch_sources): dog dicts with the Current sheet fields, and whether the scrape got
+# all of them, so a failed scrape doesn't archive the rescue's dogs. Sources are registered
+# below and their modules are only imported when that source runs, so a single rescue
+# refresh doesn't pay for the others.
+import importlib
+
+RESCUES = {
+    'paws_of_coronado': {
+        'rescue_name': 'Paws of Coronado',
+        'module': 'rescues.paws_of_coronado_scraper',
+        'function': 'pull_paws_of_coronado',
+        'enabled': True,
+    },
+    'cantu_foundation': {
+        'rescue_name': 'Cantu Foundation',
+        'module': 'rescues.cantu_foundation',
+        'function': 'pull_cantu_foundation',
+        'enabled': True,
+    },
+    'road_to_freedom': {
+        'rescue_name': 'Road To Freedom',
+        'module': 'rescues.road_to_freedom',
+        'function': 'pull_road_to_freedom',
+        'enabled': True,
+    },
+    'amazing_strays': {
+        'rescue_name': 'Amazing Strays',
+        'module': 'rescues.amazing_strays',
+        'function': 'pull_amazing_strays',
+        'enabled': True,
+    },
+    'mother_of_dragons': {
+        'rescue_name': 'Mother of Dragons',
+        'module': 'rescues.mother_of_dragons',
+        'function': 'pull_mother_of_dragons',
+        'enabled': True,
+    },
+}
+
+def select_rescues(only=None):
+    '''
+    Pick which rescues to run.
+
+    Args:
+        only: Optional list of registry keys, defaults to every enabled rescue
+
+    Returns:
+        list: Registry keys to run
+    '''
+    if not only:
+        return [key for key, rescue in RESCUES.items() if rescue['enabled']]
+
+    unknown = [key for key in only if key not in RESCUES]
+    if unknown:
+        raise ValueError(f'Unknown rescue(s): {", ".join(unknown)}. Choose from: {", ".join(RESCUES)}')
+
+    return list(dict.fromkeys(only))
+
+def load_rescue(key):
+    '''Import a rescue's module and return its pull function.'''
+    rescue = RESCUES[key]
+    module = importlib.import_module(rescue['module'])
+    return getattr(module, rescue['function'])
+
+def run_rescue(key):
+    '''Import and run a single rescue source.'''
+    return load_rescue(key)()
@@ -1,7 +1,14 @@
 import os
 
-import requests
 from bs4 import BeautifulSoup
+from utils import transport
+from utils.description_parser import description_parser
+from utils.fetch_sources import FAILED, source_result
+
+try:
+    import lxml
+except ImportError:
+    lxml = None
 
 
 def pull_amazing_strays():
@@ -9,7 +16,7 @@ def pull_amazing_strays():
     Scrape foster dogs from Amazing Strays
 
     Returns:
-        list: List of dictionaries containing dog information
+        dict: source_result with the dogs scraped, failed if any of it went wrong
     '''
 
     dogs = []
@@ -29,6 +36,7 @@ def pull_amazing_strays():
                                     }
                                 ) {
                                     items {
+                                        id
                                         name
                                         }
                                     }
@@ -39,13 +47,14 @@ def pull_amazing_strays():
                                     }
                                 ) {
                                     items {
+                                        id
                                         name
                                     }
                                 }
                             }
                         }"""
         data = {'query' : query}
-        response = requests.post(api_url, json=data, headers=headers)
+        response = transport.post(api_url, json=data, headers=headers)
         response.raise_for_status()
 
         current_dogs = []
@@ -55,80 +64,139 @@ def pull_amazing_strays():
         current_dogs.extend(temp_needed)
         current_dogs.extend(other_dogs)
 
-        soup_html = requests.get(soup_url, timeout=10)
+        soup_html = transport.get(soup_url)
         soup_html.raise_for_status()
-        for dog in current_dogs:
-            name_to_search = dog.get('name', '').split(' ')[0]
-            result = get_dog_info(soup_html.content, name_to_search)
-            if result:
-                print(result)
-            print(dog)
-            break
 
+        # Parse the page once, then every board item is a dictionary lookup
+        dogs = items_to_dogs(current_dogs, build_dog_index(soup_html.content))
 
         print(f'Scraped {len(dogs)} dogs from Amazing Strays')
     except Exception as e:
         print(f'Error scraping Amazing Strays: {e}')
+        return source_result([], FAILED, repr(e))
+
+    return source_result(dogs)
+
+
+
+def items_to_dogs(items, dog_index):
+    '''
+    Build dog dicts from Monday.com board items and the site's index from build_dog_index.
+
+    Returns:
+        list: List of dictionaries containing dog information
+    '''
+
+    dogs = []
+    seen_ids = set()
+    for dog in items:
+        # A dog can be in both groups
+        if dog.get('id') in seen_ids:
+            continue
+        seen_ids.add(dog.get('id'))
+
+        # Dogs missing from the site are still listed, just without a photo or bio
+        name = dog.get('name', '').strip()
+        result = find_dog(dog_index, name) or {}
+        if not result:
+            print(f'Could not find {name} on the Amazing Strays site')
+
+        dogs.append({
+            'Name': result.get('name') or name,
+            'Description': (result.get('description') or '').replace('\n', '$$'),
+            'Image_URL': result.get('image') or '',
+            'Rescue_Name': 'Amazing Strays',
+            'Their_Id': dog.get('id', '')
+        })
+
+    # The site only has a bio, so age, gender and weight come from it
+    for dog, info in zip(dogs, description_parser.parse_many(dog['Description'] for dog in dogs)):
+        dog['Breed'] = ''
+        dog['Age'] = info['age']
+        dog['Gender'] = info['gender']
+        dog['Weight'] = info['weight']
 
     return dogs
 
 
+def build_dog_index(html):
+    '''
+    Parse the available dogs page once into a lookup of normalized name -> dog info.
+
+    Each gallery item is keyed by its full title and its first name. Images in the adopt
+    list are keyed the same way from their alt text, but never replace a gallery item.
 
-def get_dog_info(html, dog_name):
-    soup = BeautifulSoup(html, 'html.parser')
+    The page is parsed with lxml when it is installed. Python's html.parser gets slower with
+    every image already seen, so its time grows with the square of the dogs on the page.
 
-    # Find the title element containing the dog's name
-    title_elem = soup.find('div', {'data-hook': 'item-title'}, string=lambda t: t and t.strip().startswith(dog_name))
+    Returns:
+        dict: Normalized name -> {'name', 'image', 'description'}
+    '''
 
-    if not title_elem:
-        # Try finding the span inside
-        title_span = soup.find('span', string=dog_name)
-        if title_span:
-            title_elem = title_span.find_parent('div', {'data-hook': 'item-title'})
+    soup = BeautifulSoup(html, 'lxml' if lxml is not None else 'html.parser')
+    index = {}
 
-    if not title_elem:
-        return get_dog_from_adopt_list(soup, dog_name)
+    for title_elem in soup.find_all('div', {'data-hook': 'item-title'}):
+        # Extract full name from the title element
+        full_name = title_elem.get_text(strip=True)
+        if not full_name:
+            continue
 
-    # Extract full name from the title element
-    full_name = title_elem.get_text(strip=True)
+        # Get the container
+        container = title_elem.find_parent('div', class_='gallery-item-container')
 
-    # Get the container
-    container = title_elem.find_parent('div', class_='gallery-item-container')
+        # Get the image
+        img = container.find('img', {'data-hook': 'gallery-item-image-img'}) if container else None
+        image_url = img['src'] if img else None
 
-    # Get the image
-    img = container.find('img', {'data-hook': 'gallery-item-image-img'})
-    image_url = img['src'] if img else None
+        # Get the description
+        desc_elem = container.find('div', {'data-hook': 'item-description'}) if container else None
+        description = desc_elem.get_text(strip=True) if desc_elem else None
 
-    # Get the description
-    desc_elem = container.find('div', {'data-hook': 'item-description'})
-    description = desc_elem.get_text(strip=True) if desc_elem else None
+        _add_to_index(index, full_name, {
+            'name': full_name,
+            'image': image_url,
+            'description': description
+        })
 
-    return {
-        'name': full_name,
-        'image': image_url,
-        'description': description
-    }
+    # Fallback to the adopt list images (e.g. "Georgie May's preview photo")
+    for img in soup.find_all('img', alt=True):
+        full_name = img['alt'].replace("'s preview photo", '').strip()
+        if not full_name:
+            continue
 
+        _add_to_index(index, full_name, {
+            'name': full_name,
+            'image': img.get('src'),
+            'description': None
+        })
 
-def get_dog_from_adopt_list(soup, dog_name):
-    '''
-    Fallback function to get dog image from get dog from adopt list
+    return index
+
+
+def find_dog(index, dog_name):
     '''
+    Look up a Monday.com item name in an index from build_dog_index.
+
+    Tries the full name first, then just the first name.
 
-    # Find img with alt text starting with dog name
-    img = soup.find('img', alt=lambda a: a and a.lower().startswith(dog_name.lower()))
+    Returns:
+        dict: {'name', 'image', 'description'}, or None if the dog isn't on the page
+    '''
 
-    if not img:
+    name = normalize_name(dog_name)
+    if not name:
         return None
+    return index.get(name) or index.get(name.split(' ')[0])
+
 
-    image_url = img.get('src')
+def normalize_name(name):
+    '''Lowercase a name and collapse its whitespace.'''
+    return ' '.join(name.lower().split())
 
-    # Extract full name from alt text (e.g., "Georgie May's preview photo" -> "Georgie May")
-    alt_text = img.get('alt', '')
-    full_name = alt_text.replace("'s preview photo", '').strip()
 
-    return {
-        'name': full_name,
-        'image': image_url,
-        'description': None
-    }
+def _add_to_index(index, full_name, info):
+    # First match in page order wins, like a find() would
+    name = normalize_name(full_name)
+    index.setdefault(name, info)
+    index.setdefault(name.split(' ')[0], info)
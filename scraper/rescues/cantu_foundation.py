@@ -1,4 +1,11 @@
-from utils.google_sheet import get_google_spreadsheet
+from utils.fetch_sources import FAILED, source_result
+from utils.google_sheet import get_google_spreadsheet, read_sheet_records
+
+SPREADSHEET_NAME = 'TCF x Fido spreadsheet'
+NAME_HEADER = '' # IMPORTRANGE doesn't pull the header, so we have to use a blank column as the name key
+STOP_AT = 'DOGS IN SAN DIEGO' # Dogs below this row are already in San Diego
+# The only columns read from the sheet
+COLUMNS = [NAME_HEADER, 'Breed', 'Age ', 'Gender', 'Weight', 'Fur Color', 'Image', 'Foster lined up', 'Notes for website ']
 
 
 def pull_cantu_foundation():
@@ -6,44 +13,48 @@ def pull_cantu_foundation():
     Scrape foster dogs from Cantu Foundation.
 
     Returns:
-        list: List of dictionaries containing dog information
+        dict: source_result with the dogs scraped, failed if any of it went wrong
     '''
 
     rescue_name = 'Cantu Foundation'
     dogs = []
-    spreadsheet_name = 'TCF x Fido spreadsheet'
-    stop_at = 'DOGS IN SAN DIEGO'
-    name_header = '' # IMPORTRANGE doesn't pull the header, so we have to use a blank column as the name key
 
     try:
-        spreadsheet = get_google_spreadsheet(spreadsheet_name)
-        print(f'Successfully accessed spreadsheet: {spreadsheet_name}')
-        worksheet = spreadsheet.sheet1
-        rows = worksheet.get_all_records()
-
-        for row in rows:
-            name = row.get(name_header, '')
-            if name == stop_at:
-                break
-
-            has_foster = row.get('Foster lined up', '').strip().lower()
-            note_for_website = row.get('Notes for website ', '').strip().lower()
-            if has_foster == '' and note_for_website != '':
-                dog = {
-                    'Name': name,
-                    'Breed': row.get('Breed', ''),
-                    'Age': row.get('Age ', ''),
-                    'Gender': row.get('Gender', ''),
-                    'Weight': row.get('Weight', ''),
-                    'Description': note_for_website,
-                    'Image_URL': row.get('Image', ''),
-                    'Rescue_Name': rescue_name,
-                    'Their_Id': f'{name}_{row.get("Fur Color", "")}'
-                }
-                dogs.append(dog)
+        spreadsheet = get_google_spreadsheet(SPREADSHEET_NAME)
+        print(f'Successfully accessed spreadsheet: {SPREADSHEET_NAME}')
+        rows = read_sheet_records(spreadsheet, COLUMNS, stop_column=NAME_HEADER, stop_at=STOP_AT)
+        dogs = rows_to_dogs(rows)
         print(f'Scraped {len(dogs)} dogs from {rescue_name}')
 
     except Exception as e:
         print(f'Error accessing spreadsheet: {repr(e)}')
-        return []
+        return source_result([], FAILED, repr(e))
+    return source_result(dogs)
+
+
+def rows_to_dogs(rows):
+    '''
+    Build dog dicts from the sheet's records, skipping dogs with a foster lined up or no notes.
+
+    Returns:
+        list: List of dictionaries containing dog information
+    '''
+
+    dogs = []
+    for row in rows:
+        name = row.get(NAME_HEADER, '')
+        has_foster = row.get('Foster lined up', '').strip().lower()
+        note_for_website = row.get('Notes for website ', '').strip().lower()
+        if has_foster == '' and note_for_website != '':
+            dogs.append({
+                'Name': name,
+                'Breed': row.get('Breed', ''),
+                'Age': row.get('Age ', ''),
+                'Gender': row.get('Gender', ''),
+                'Weight': row.get('Weight', ''),
+                'Description': note_for_website,
+                'Image_URL': row.get('Image', ''),
+                'Rescue_Name': 'Cantu Foundation',
+                'Their_Id': f'{name}_{row.get("Fur Color", "")}'
+            })
     return dogs
@@ -1,4 +1,9 @@
-from utils.google_sheet import get_google_spreadsheet
+from utils.fetch_sources import FAILED, source_result
+from utils.google_sheet import get_google_spreadsheet, read_sheet_records
+
+SPREADSHEET_NAME = 'Mother of Dragons Foster Dog List'
+# The only columns read from the sheet
+COLUMNS = ['Name', 'Breed', 'Age', 'Gender', 'Weight', 'Description / Bio', 'Image']
 
 
 def pull_mother_of_dragons():
@@ -6,35 +11,45 @@ def pull_mother_of_dragons():
     Scrape foster dogs from Mother of Dragons Rescue.
 
     Returns:
-        list: List of dictionaries containing dog information
+        dict: source_result with the dogs scraped, failed if any of it went wrong
     '''
 
     rescue_name = 'Mother of Dragons'
     dogs = []
-    spreadsheet_name = 'Mother of Dragons Foster Dog List'
 
     try:
-        spreadsheet = get_google_spreadsheet(spreadsheet_name)
-        print(f'Successfully accessed spreadsheet: {spreadsheet_name}')
-        worksheet = spreadsheet.sheet1
-        rows = worksheet.get_all_records()
-        for row in rows:
-            dog = {
-                'Name': row.get('Name', ''),
-                'Breed': row.get('Breed', ''),
-                'Age': row.get('Age', ''),
-                'Gender': row.get('Gender', ''),
-                'Weight': row.get('Weight', ''),
-                'Description': row.get('Description / Bio', '').replace('\n', '$$'),
-                'Image_URL': row.get('Image', ''),
-                'Rescue_Name': rescue_name,
-                'Their_Id': f'{row.get("Name", "")}_{row.get("Breed", "")}'
-            }
-            dogs.append(dog)
+        spreadsheet = get_google_spreadsheet(SPREADSHEET_NAME)
+        print(f'Successfully accessed spreadsheet: {SPREADSHEET_NAME}')
+        rows = read_sheet_records(spreadsheet, COLUMNS)
+        dogs = rows_to_dogs(rows)
 
         print(f'Scraped {len(dogs)} dogs from {rescue_name}')
 
     except Exception as e:
         print(f'Error accessing spreadsheet: {repr(e)}')
-        return []
-    return dogs
+        return source_result([], FAILED, repr(e))
+    return source_result(dogs)
+
+
+def rows_to_dogs(rows):
+    '''
+    Build dog dicts from the sheet's records.
+
+    Returns:
+        list: List of dictionaries containing dog information
+    '''
+
+    return [
+        {
+            'Name': row.get('Name', ''),
+            'Breed': row.get('Breed', ''),
+            'Age': row.get('Age', ''),
+            'Gender': row.get('Gender', ''),
+            'Weight': row.get('Weight', ''),
+            'Description': row.get('Description / Bio', '').replace('\n', '$$'),
+            'Image_URL': row.get('Image', ''),
+            'Rescue_Name': 'Mother of Dragons',
+            'Their_Id': f'{row.get("Name", "")}_{row.get("Breed", "")}'
+        }
+        for row in rows
+    ]
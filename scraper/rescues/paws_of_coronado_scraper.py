@@ -1,68 +1,118 @@
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 
 import requests
-from dateutil.relativedelta import relativedelta
+from utils.fetch_sources import FAILED, PARTIAL, source_result
+from utils.http_cache import fetch_parsed
 
 ACCPETABLE_STATUSES = ['Available In-Shelter']
+PAGE_SIZE = 100 # Shelterluv's maximum page size
+# The only Shelterluv fields the dog dict needs, everything else is dropped as each page arrives
+ANIMAL_FIELDS = ['Name', 'Breed', 'DOBUnixTime', 'Sex', 'CurrentWeightPounds', 'Description', 'CoverPhoto', 'Internal-ID']
 
 def pull_paws_of_coronado():
     '''
     Scrape foster dogs from Paws of Coronado
 
     Returns:
-        list: List of dictionaries containing dog information
+        dict: source_result with the dogs scraped, partial if a later page couldn't be fetched
     '''
 
     rescue_name = 'Paws of Coronado'
     dogs = []
-    url = 'https://new.shelterluv.com/api/v1/animals'
-    token = os.getenv('PAWS_OF_CORONADO_TOKEN')
 
     try:
-        response = requests.get(url, params={'status_type': 'in custody'}, timeout=10, headers={'Authorization': f'Bearer {token}'})
-        response.raise_for_status()
-
-        animals = response.json()['animals']
-
-        for animal in animals:
-            # Dogs only, skip in foster, skip Lifetime Care Program
-            if animal.get('Type', '') != 'Dog' or animal.get('InFoster', '') or animal.get('Status', '') not in ACCPETABLE_STATUSES:
-                continue
-
-            dog = {
-                'Name': animal.get('Name', ''),
-                'Breed': animal.get('Breed', ''),
-                'Age': unix_to_age(animal.get('DOBUnixTime', 0)),
-                'Gender': animal.get('Sex', ''),
-                'Weight': animal.get('CurrentWeightPounds', '').split('.', 1)[0],
-                'Description': animal.get('Description', '').replace('\n', '$$'),
-                'Image_URL': animal.get('CoverPhoto', ''),
-                'Rescue_Name': rescue_name,
-                'Their_Id': animal.get('Internal-ID', '')
-            }
+        for dog in iter_paws_of_coronado_dogs():
             dogs.append(dog)
 
         print(f'Scraped {len(dogs)} dogs from {rescue_name}')
 
     except requests.RequestException as e:
         print(f'Error scraping {rescue_name}: {e}')
+        # The pages before the error are still good, but dogs on the rest are missing
+        return source_result(dogs, PARTIAL if dogs else FAILED, repr(e))
 
-    return dogs
+    return source_result(dogs)
 
-def unix_to_age(unix_timestamp):
+def iter_paws_of_coronado_dogs():
     '''
-    Convert unix timestamp to age in Y/M/D format
+    Yield Paws of Coronado dogs page by page as the Shelterluv API returns them.
+
+    Only one page of animals is held at a time, so memory doesn't grow with the shelter.
+
+    Yields:
+        dict: Dog information
+    '''
+
+    url = 'https://new.shelterluv.com/api/v1/animals'
+    token = os.getenv('PAWS_OF_CORONADO_TOKEN')
+    offset = 0
+
+    while True:
+        # Only the filtered records are cached, Age is formatted from DOB on every run
+        page = fetch_parsed(url, parse_animals_page,
+                            params={'status_type': 'in custody', 'offset': offset, 'limit': PAGE_SIZE},
+                            headers={'Authorization': f'Bearer {token}'})
+
+        for animal in page['animals']:
+            yield animal_to_dog(animal)
+
+        if not page['has_more']:
+            break
+        offset += PAGE_SIZE
+
+def animal_to_dog(animal):
+    '''Build a dog dict from a Shelterluv record trimmed by parse_animals_page.'''
+    return {
+        'Name': animal.get('Name', ''),
+        'Breed': animal.get('Breed', ''),
+        'Age': unix_to_birth_date(animal.get('DOBUnixTime', 0)),
+        'Gender': animal.get('Sex', ''),
+        'Weight': animal.get('CurrentWeightPounds', '').split('.', 1)[0],
+        'Description': animal.get('Description', '').replace('\n', '$$'),
+        'Image_URL': animal.get('CoverPhoto', ''),
+        'Rescue_Name': 'Paws of Coronado',
+        'Their_Id': animal.get('Internal-ID', '')
+    }
+
+def parse_animals_page(response):
+    '''
+    Pull the adoptable dogs out of one page of a Shelterluv animals response.
+
+    Returns:
+        dict: 'animals', the trimmed Shelterluv records for dogs that need a foster,
+              and 'has_more', whether there is another page after this one
+    '''
+
+    data = response.json()
+    animals = data['animals']
+
+    return {
+        'animals': [
+            {field: animal[field] for field in ANIMAL_FIELDS if field in animal}
+            for animal in animals
+            # Dogs only, skip in foster, skip Lifetime Care Program
+            if animal.get('Type', '') == 'Dog' and not animal.get('InFoster', '') and animal.get('Status', '') in ACCPETABLE_STATUSES
+        ],
+        # Stop on an empty page too, in case the API keeps saying there is more
+        'has_more': bool(data.get('has_more')) and len(animals) > 0,
+    }
+
+def unix_to_birth_date(unix_timestamp):
+    '''
+    Convert a unix timestamp to a birth date.
+
+    The date is stored instead of an age so the row doesn't change every day. The website
+    works out the age when it shows the dog.
 
     Args:
         unix_timestamp: Unix timestamp (seconds since epoch)
 
     Returns:
-        str: Age in format 'XY/XM/XD'
+        str: Birth date as 'YYYY-MM-DD', or '' if there is no timestamp
     '''
 
-    birth_date = datetime.fromtimestamp(unix_timestamp)
-    now = datetime.now()
-    diff = relativedelta(now, birth_date)
+    if not unix_timestamp:
+        return ''
 
-    return f'{diff.years}Y/{diff.months}M/{diff.days}D'
+    return datetime.fromtimestamp(unix_timestamp, timezone.utc).date().isoformat()
@@ -1,68 +1,15 @@
-import re
+from bs4 import BeautifulSoup, UnicodeDammit
+from utils.description_parser import description_parser
+from utils.fetch_sources import FAILED, source_result
+from utils.http_cache import fetch_parsed
 
-import requests
-from bs4 import BeautifulSoup
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
 
-
-def parse_description_info(description):
-    '''
-    Parse age, gender, and weight from description text.
-
-    Handles formats like:
-    - "My name is Ellie. I am a one and a half year old female who weighs 50 pounds."
-    - "Ruby, one and a half, female, 20 pounds"
-
-    Returns:
-        dict: Dictionary with 'age', 'gender', and 'weight' keys
-    '''
-    info = {'age': '', 'gender': '', 'weight': ''}
-
-    if not description:
-        return info
-
-    # Try to extract weight (e.g., "50 pounds", "20 pounds")
-    weight_match = re.search(r'(\d+)\s*pounds?', description, re.IGNORECASE)
-    if weight_match:
-        info['weight'] = weight_match.group(1)
-
-    # Try to extract gender
-    if re.search(r'\bfemale\b', description, re.IGNORECASE):
-        info['gender'] = 'Female'
-    elif re.search(r'\bmale\b', description, re.IGNORECASE):
-        info['gender'] = 'Male'
-
-    # Try to extract age patterns
-    # Matches: "one and a half year old", "2 year old", "3 years old", "one and a half," etc.
-    age_pattern = r'(\w+\s+and\s+a\s+half|\d+(?:\.\d+)?)\s*(?:years?\s*old)?(?:,|\.|\s|$)'
-
-    # Word to number mapping for common ages
-    word_to_num = {
-        'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5',
-        'six': '6', 'seven': '7', 'eight': '8', 'nine': '9', 'ten': '10'
-    }
-
-    age_match = re.search(age_pattern, description, re.IGNORECASE)
-    if age_match:
-        age_text = age_match.group(1)
-        # Handle "X and a half" format
-        if 'and a half' in age_text.lower():
-            # Extract the number part before "and a half"
-            num_match = re.match(r'(\w+)\s+and\s+a\s+half', age_text, re.IGNORECASE)
-            if num_match:
-                num_part = num_match.group(1).lower()
-                # Convert word to number if needed
-                if num_part in word_to_num:
-                    info['age'] = f"{word_to_num[num_part]}.5"
-                elif num_part.isdigit():
-                    info['age'] = f"{num_part}.5"
-        else:
-            # Check if it's a word number
-            if age_text.lower() in word_to_num:
-                info['age'] = word_to_num[age_text.lower()]
-            else:
-                info['age'] = age_text
-
-    return info
+CARD_CLASS = 'Bzl-dog-post'
+CARD_XPATH = "//*[contains(concat(' ', normalize-space(@class), ' '), ' Bzl-dog-post ')]"
 
 
 def pull_road_to_freedom():
@@ -70,86 +17,172 @@ def pull_road_to_freedom():
     Scrape foster dogs from Road To Freedom
 
     Returns:
-        list: List of dictionaries containing dog information
+        dict: source_result with the dogs scraped, failed if any of it went wrong
     '''
 
-    dogs = []
-
     url = 'https://roadtofreedomrescue.com/forever-foster-dogs/'
 
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        animals = soup.find_all(class_='Bzl-dog-post')
-
-        for animal in animals:
-            # Extract name from the heading link
-            name_elem = animal.find('div', class_='Bzl-dog-heading').find('a')
-            name = name_elem.text.strip() if name_elem else ''
-
-            # Extract ID from the data-name attribute or URL
-            dog_id = animal.get('data-name', '').strip()
-            if not dog_id and name_elem:
-                # Fallback to extracting from URL
-                url_href = name_elem.get('href', '')
-                if url_href:
-                    dog_id = url_href.rstrip('/').split('/')[-1]
-
-            # Extract image URL
-            img_elem = animal.find('div', class_='Bzl-dog-img').find('img') if animal.find('div', class_='Bzl-dog-img') else None
-            image_url = img_elem.get('src', '') if img_elem else ''
-
-            # Extract description
-            description_elem = animal.find('div', class_='Bzl-dog-description')
-            description = description_elem.find('p').text.strip() if description_elem and description_elem.find('p') else ''
-
-            # Extract breed, gender, and age from meta section
-            meta_div = animal.find('div', class_='Bzl-dog-meta')
-            breed = ''
-            gender = ''
-            age = ''
-
-            if meta_div:
-                meta_rows = meta_div.find_all('div', class_='col-12')
-                for row in meta_rows:
-                    icon = row.find('i')
-                    if icon:
-                        if 'icon-dog-face' in icon.get('class', []):
-                            breed = row.text.strip().replace('\n', '').strip()
-                        elif 'icon-female-sign' in icon.get('class', []):
-                            gender = 'Female'
-                        elif 'icon-male-sign' in icon.get('class', []):
-                            gender = 'Male'
-                        elif 'icon-cake' in icon.get('class', []):
-                            age = row.text.strip().replace('\n', '').strip()
-
-            # Parse additional info from description
-            desc_info = parse_description_info(description)
-
-            # Use description info as fallback if meta info is missing
-            if not gender and desc_info['gender']:
-                gender = desc_info['gender']
-            if (not age or age == '0  Days Old') and desc_info['age']:
-                age = desc_info['age']
-
-            weight = desc_info['weight']
-
-            dogs.append({
-                'Name': name,
-                'Breed': breed,
-                'Age': age,
-                'Gender': gender,
-                'Weight': weight,
-                'Description': description,
-                'Image_URL': image_url,
-                'Rescue_Name': 'Road To Freedom',
-                'Their_Id': dog_id
-            })
+        dogs = fetch_parsed(url, lambda response: parse_road_to_freedom(response.content))
 
         print(f'Scraped {len(dogs)} dogs from Road To Freedom')
     except Exception as e:
         print(f'Error scraping Road To Freedom: {e}')
+        return source_result([], FAILED, repr(e))
+
+    return source_result(dogs)
+
+
+def parse_road_to_freedom(html, fast=True):
+    '''
+    Parse the dog cards out of the Road To Freedom forever foster page.
+
+    When lxml is installed the fast mode reads the cards straight out of an lxml tree, with one
+    walk per card, which is many times quicker than BeautifulSoup on large pages. Otherwise, or
+    with fast=False, the page is parsed with BeautifulSoup, which is the reference output the
+    fast mode must match.
+
+    Returns:
+        list: List of dictionaries containing dog information
+    '''
+
+    if fast and lxml is not None:
+        markup = html if isinstance(html, str) else UnicodeDammit(html, is_html=True).unicode_markup
+        cards = lxml.html.fromstring(markup).xpath(CARD_XPATH)
+        read_card = _read_card_lxml
+    else:
+        cards = BeautifulSoup(html, 'html.parser').find_all(class_=CARD_CLASS)
+        read_card = _read_card_with_find
+
+    dogs = []
+
+    for animal in cards:
+        name, url_href, image_url, description, breed, gender, age = read_card(animal)
+
+        # Extract ID from the data-name attribute or URL
+        dog_id = animal.get('data-name', '').strip()
+        if not dog_id and url_href:
+            # Fallback to extracting from URL
+            dog_id = url_href.rstrip('/').split('/')[-1]
+
+        # Parse additional info from description
+        desc_info = description_parser.parse(description)
+
+        # Use description info as fallback if meta info is missing
+        if not gender and desc_info['gender']:
+            gender = desc_info['gender']
+        if (not age or age == '0  Days Old') and desc_info['age']:
+            age = desc_info['age']
+
+        weight = desc_info['weight']
+
+        dogs.append({
+            'Name': name,
+            'Breed': breed,
+            'Age': age,
+            'Gender': gender,
+            'Weight': weight,
+            'Description': description,
+            'Image_URL': image_url,
+            'Rescue_Name': 'Road To Freedom',
+            'Their_Id': dog_id
+        })
 
     return dogs
+
+
+def _read_card_lxml(animal):
+    '''
+    Read an lxml dog card's fields, finding every section in a single walk of the card.
+
+    Returns:
+        tuple: (name, name link href, image url, description, breed, gender, age)
+    '''
+
+    heading = image_div = description_div = meta_div = None
+    for div in animal.iterdescendants('div'):
+        classes = div.get('class', '').split()
+        if heading is None and 'Bzl-dog-heading' in classes:
+            heading = div
+        if image_div is None and 'Bzl-dog-img' in classes:
+            image_div = div
+        if description_div is None and 'Bzl-dog-description' in classes:
+            description_div = div
+        if meta_div is None and 'Bzl-dog-meta' in classes:
+            meta_div = div
+
+    name_elem = next(heading.iterdescendants('a'), None) if heading is not None else None
+    name = name_elem.text_content().strip() if name_elem is not None else ''
+    url_href = name_elem.get('href', '') if name_elem is not None else ''
+
+    img_elem = next(image_div.iterdescendants('img'), None) if image_div is not None else None
+    image_url = img_elem.get('src', '') if img_elem is not None else ''
+
+    paragraph = next(description_div.iterdescendants('p'), None) if description_div is not None else None
+    description = paragraph.text_content().strip() if paragraph is not None else ''
+
+    breed = ''
+    gender = ''
+    age = ''
+
+    if meta_div is not None:
+        for row in meta_div.iterdescendants('div'):
+            if 'col-12' not in row.get('class', '').split():
+                continue
+            icon = next(row.iterdescendants('i'), None)
+            if icon is not None:
+                icon_classes = icon.get('class', '').split()
+                if 'icon-dog-face' in icon_classes:
+                    breed = row.text_content().strip().replace('\n', '').strip()
+                elif 'icon-female-sign' in icon_classes:
+                    gender = 'Female'
+                elif 'icon-male-sign' in icon_classes:
+                    gender = 'Male'
+                elif 'icon-cake' in icon_classes:
+                    age = row.text_content().strip().replace('\n', '').strip()
+
+    return name, url_href, image_url, description, breed, gender, age
+
+
+def _read_card_with_find(animal):
+    '''
+    Read a BeautifulSoup dog card's fields with a separate search per field.
+
+    Returns:
+        tuple: (name, name link href, image url, description, breed, gender, age)
+    '''
+
+    # Extract name from the heading link
+    name_elem = animal.find('div', class_='Bzl-dog-heading').find('a')
+    name = name_elem.text.strip() if name_elem else ''
+    url_href = name_elem.get('href', '') if name_elem else ''
+
+    # Extract image URL
+    img_elem = animal.find('div', class_='Bzl-dog-img').find('img') if animal.find('div', class_='Bzl-dog-img') else None
+    image_url = img_elem.get('src', '') if img_elem else ''
+
+    # Extract description
+    description_elem = animal.find('div', class_='Bzl-dog-description')
+    description = description_elem.find('p').text.strip() if description_elem and description_elem.find('p') else ''
+
+    # Extract breed, gender, and age from meta section
+    meta_div = animal.find('div', class_='Bzl-dog-meta')
+    breed = ''
+    gender = ''
+    age = ''
+
+    if meta_div:
+        meta_rows = meta_div.find_all('div', class_='col-12')
+        for row in meta_rows:
+            icon = row.find('i')
+            if icon:
+                if 'icon-dog-face' in icon.get('class', []):
+                    breed = row.text.strip().replace('\n', '').strip()
+                elif 'icon-female-sign' in icon.get('class', []):
+                    gender = 'Female'
+                elif 'icon-male-sign' in icon.get('class', []):
+                    gender = 'Male'
+                elif 'icon-cake' in icon.get('class', []):
+                    age = row.text.strip().replace('\n', '').strip()
+
+    return name, url_href, image_url, description, breed, gender, age
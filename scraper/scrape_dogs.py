@@ -1,62 +1,169 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+from functools import partial
+
 from dotenv import load_dotenv
-from rescues.cantu_foundation import pull_cantu_foundation
-from rescues.mother_of_dragons import pull_mother_of_dragons
-from rescues.paws_of_coronado_scraper import pull_paws_of_coronado
-from rescues.road_to_freedom import pull_road_to_freedom
-from utils.google_sheet import get_google_spreadsheet, update_sheet_with_dogs
+from rescues import RESCUES, run_rescue, select_rescues
+from utils import transport
+from utils.fetch_sources import SUCCESS, fetch_sources
+from utils.google_sheet import (
+    append_log,
+    get_google_spreadsheet,
+    read_current_dogs,
+    sheets_quota_stats,
+    sheets_quota_summary,
+    update_sheet_with_dogs,
+)
+from utils.metrics import build_run_metrics, summarize_run, timed, write_metrics
+from utils.snapshot import snapshot_revision, write_snapshot
+from utils.sync_plan import format_plan, plan_sheet_sync
 
 load_dotenv()
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Scrape foster dogs and sync them to the Google Sheet.')
+    parser.add_argument('--only', nargs='+', metavar='RESCUE', choices=list(RESCUES),
+                        help=f'Only run these rescues ({", ".join(RESCUES)})')
+    parser.add_argument('--list', action='store_true', help='List the available rescues and exit')
+    parser.add_argument('--workers', type=int, help='Number of rescues fetched at once')
+    parser.add_argument('--timeout', type=float, help='Seconds every rescue has to finish')
+    parser.add_argument('--plan', nargs='?', const='', metavar='FILE',
+                        help='Show what the sync would change and its API calls without writing, '
+                             'or save it to FILE as JSON')
+    return parser.parse_args(argv)
+
+def snapshot_thumbnails(snapshot_dir, dogs):
+    '''
+    Make thumbnails of the dogs' images in SCRAPER_THUMBNAIL_DIR, if it is set.
+
+    Returns:
+        dict: Image_URL -> thumbnail path relative to snapshot_dir
+    '''
+    thumbnail_dir = os.getenv('SCRAPER_THUMBNAIL_DIR')
+    if not thumbnail_dir:
+        return {}
+
+    # Only runs making thumbnails pay for importing Pillow
+    from utils.thumbnails import build_thumbnails
+
+    prefix = os.path.relpath(thumbnail_dir, snapshot_dir).replace(os.sep, '/')
+    hashes = build_thumbnails(thumbnail_dir, [dog.get('Image_URL', '') for dog in dogs])
+    return {url: f'{prefix}/{image_hash}' for url, image_hash in hashes.items()}
+
+def write_plan(path, plan):
+    '''Print a sync plan, or write it as JSON to path if one is given.'''
+    if not path:
+        print(format_plan(plan))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(plan, f, indent=1)
+        print(f'Sync plan written to {path}')
+
+def main(argv=None):
     '''
     Main scraping workflow.
     '''
+    args = parse_args(argv)
+
+    if args.list:
+        for key, rescue in RESCUES.items():
+            print(f'{key}: {rescue["rescue_name"]}{"" if rescue["enabled"] else " (disabled)"}')
+        return
+
+    rescue_keys = select_rescues(args.only)
+
     print('Starting foster dog scraper...')
+    started = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    start = time.monotonic()
+    stages = {}
 
     # Get Google Sheet
     try:
-        spreadsheet = get_google_spreadsheet()
+        with timed(stages, 'open_sheet'):
+            spreadsheet = get_google_spreadsheet()
     except Exception as e:
         print('Failed to grab google sheet exiting', e)
 
 
-    # Grab info from all rescue sources
+    # Grab info from the selected rescue sources
+    sources = [(RESCUES[key]['rescue_name'], partial(run_rescue, key)) for key in rescue_keys]
+    with timed(stages, 'fetch'):
+        results = fetch_sources(sources, max_workers=args.workers, timeout=args.timeout)
     all_dogs = []
+    succeeded = []
+    for result in results:
+        all_dogs.extend(result['dogs'])
+        if result['status'] == SUCCESS:
+            succeeded.append(result['source'])
+        else:
+            print(f'{result["source"]} was not fully scraped, keeping its dogs that are missing')
 
-    # Paws of Coronado
-    print('Pulling from Paws of Coronado')
-    paws_dogs = pull_paws_of_coronado()
-    all_dogs.extend(paws_dogs)
-
-    # Cantu Foundation
-    print('Pulling from Cantu Foundation')
-    cantu_foundation_dogs = pull_cantu_foundation()
-    all_dogs.extend(cantu_foundation_dogs)
-
-    # Road to Freedom
-    print('Pulling from Road to Freedom')
-    road_to_freedom = pull_road_to_freedom()
-    all_dogs.extend(road_to_freedom)
-
-    # # Amazing Strays
-    # print('Pulling from Amazing Strays')
-    # amazing_strays = pull_amazing_strays()
-    # all_dogs.extend(amazing_strays)
+    print(f'Total dogs info grabbed: {len(all_dogs)}')
 
-    # Mother of Dragons
-    print('Pulling from Mother of Dragons')
-    mother_of_dragons = pull_mother_of_dragons()
-    all_dogs.extend(mother_of_dragons)
+    # Update sheet, only dogs from the rescues that were fully scraped can be archived, and
+    # a run of only some rescues leaves the other rescues' rows alone
+    partitions = [RESCUES[key]['rescue_name'] for key in rescue_keys] if args.only else None
 
-    print(f'Total dogs info grabbed: {len(all_dogs)}')
+    # A plan runs the same diff but writes nothing, not even the snapshot or metrics
+    if args.plan is not None:
+        if len(all_dogs) > 0:
+            # Reads so far, of the rescues' own sheets and opening this one, a real run makes too
+            scrape_reads = (sheets_quota_stats() or {}).get('reads')
+            plan = plan_sheet_sync(spreadsheet, all_dogs, rescue_names=succeeded, partitions=partitions,
+                                   scrape_reads=scrape_reads)
+            write_plan(args.plan, plan)
+        else:
+            print('No dogs found, nothing would be synced')
+        return
 
-    # Update sheet
+    sync = None
     if len(all_dogs) > 0:
-        update_sheet_with_dogs(spreadsheet, all_dogs)
+        with timed(stages, 'sync'):
+            sync = update_sheet_with_dogs(spreadsheet, all_dogs, rescue_names=succeeded, partitions=partitions)
         print('Sheet updated successfully!')
     else:
         print('No dogs found to update')
 
+    # The website loads this snapshot of the Current sheet instead of the published sheet
+    snapshot_dir = os.getenv('SCRAPER_SNAPSHOT_DIR')
+    if snapshot_dir:
+        try:
+            with timed(stages, 'snapshot'):
+                # The revision is read first, so a write during the read only means reading again next run
+                revision = spreadsheet.get_lastUpdateTime()
+                written = None
+                if revision != snapshot_revision(snapshot_dir):
+                    current_dogs = read_current_dogs(spreadsheet)
+                    thumbnails = snapshot_thumbnails(snapshot_dir, current_dogs)
+                    written = write_snapshot(snapshot_dir, current_dogs, thumbnails, revision)
+            if written is None:
+                print('Sheet unchanged since the dogs snapshot, not reading it')
+            elif written:
+                print(f'Wrote a new dogs snapshot to {snapshot_dir}')
+            else:
+                print('Dogs snapshot unchanged')
+        except Exception as e:
+            print(f'Failed to write the dogs snapshot: {repr(e)}')
+
+    for summary in (transport.summary(), sheets_quota_summary()):
+        if summary:
+            print(summary)
+
+    # One JSON line per run, so regressions and quota headroom can be tracked across runs
+    run_metrics = build_run_metrics(started, time.monotonic() - start, stages, results, sync)
+    metrics_file = os.getenv('SCRAPER_METRICS_FILE')
+    if metrics_file:
+        write_metrics(metrics_file, run_metrics)
+        print(f'Run metrics added to {metrics_file}')
+    if os.getenv('SCRAPER_METRICS_LOG', '').lower() == 'true':
+        try:
+            append_log(spreadsheet, 'Run metrics', summarize_run(run_metrics))
+        except Exception as e:
+            print(f'Failed to log the run metrics: {repr(e)}')
+
 
 if __name__ == '__main__':
     main()
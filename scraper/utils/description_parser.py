@@ -0,0 +1,110 @@
+import re
+
+NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10,
+    'eleven': 11, 'twelve': 12, 'thirteen': 13, 'fourteen': 14, 'fifteen': 15,
+    'sixteen': 16, 'seventeen': 17, 'eighteen': 18, 'nineteen': 19, 'twenty': 20,
+}
+
+class DescriptionParser:
+    '''
+    Pull age, gender, and weight out of free-text dog bios.
+
+    Every pattern is compiled once into a single regex and each description is scanned once,
+    stopping as soon as age, weight and gender are all known. Create one parser and reuse it.
+
+    Handles formats like:
+    - "My name is Ellie. I am a one and a half year old female who weighs 50 pounds."
+    - "Ruby, one and a half, female, 20 pounds"
+    - "Max is an 8 month old male, 10 lbs"
+    - "Pepper is twelve years old"
+    '''
+
+    def __init__(self):
+        # Longest words first so "fourteen" isn't read as "four"
+        words = sorted(NUMBER_WORDS, key=len, reverse=True)
+        number = r'\d+(?:\.\d+)?|' + '|'.join(words)
+        first_letters = ''.join(sorted({word[0] for word in words} | {'f', 'm'}))
+
+        # A number followed by what it measures, or a gender. Matches can only start on a digit
+        # or a letter that begins one of the words, which lets the scan skip everything else.
+        self.pattern = re.compile(
+            rf'\b(?=[\d{first_letters}])(?:'
+            rf'(?P<number>{number})(?P<unit>'
+            r'\s*(?:pounds?|lbs?)\b'
+            r'|\s+and\s+a\s+half\b(?:\s*years?[\s-]*old)?'
+            r'|[\s-]*(?:years?|yrs?)\b(?:[\s-]*old)?'
+            r'|[\s-]*(?:months?|mos?)\b(?:[\s-]*old)?'
+            r'|(?=,|\.(?!\d)|\s|$))'
+            r'|(?P<gender>female|male)\b)'
+        )
+        self.female_pattern = re.compile(r'\bfemale\b')
+
+    def parse(self, description):
+        '''
+        Parse age, gender, and weight from one description.
+
+        Age is in years ("1.5", "3") or months ("8 months"). A lone number like "Ruby, 2, female"
+        is only used as the age when nothing says years or months. A female anywhere in the text
+        wins over a male, e.g. "a male-friendly female".
+
+        Returns:
+            dict: Dictionary with 'age', 'gender', and 'weight' keys
+        '''
+        info = {'age': '', 'gender': '', 'weight': ''}
+
+        if not description:
+            return info
+
+        text = description.lower()
+        bare_age = ''
+        end = 0
+
+        for match in self.pattern.finditer(text):
+            end = match.end()
+            gender = match.group('gender')
+            if gender:
+                if gender == 'female' or not info['gender']:
+                    info['gender'] = gender.capitalize()
+            else:
+                value = match.group('number')
+                unit = match.group('unit').strip(' -\t\n')
+                number = str(NUMBER_WORDS.get(value, value))
+
+                if unit.startswith(('pound', 'lb')):
+                    info['weight'] = info['weight'] or number
+                elif info['age']:
+                    pass
+                elif unit.startswith('and'):
+                    info['age'] = f'{number}.5'
+                elif unit.startswith('y'):
+                    info['age'] = number
+                elif unit.startswith('mo'):
+                    info['age'] = f'{number} months'
+                elif value[0].isdigit() and not bare_age:
+                    bare_age = value
+
+            if info['age'] and info['weight'] and info['gender']:
+                break
+
+        # Stopped early on a male, make sure a female doesn't come later
+        if info['gender'] == 'Male' and self.female_pattern.search(text, end):
+            info['gender'] = 'Female'
+
+        if not info['age']:
+            info['age'] = bare_age
+
+        return info
+
+    def parse_many(self, descriptions):
+        '''
+        Parse a batch of descriptions.
+
+        Returns:
+            list: One info dict per description, in the same order
+        '''
+        return [self.parse(description) for description in descriptions]
+
+# Shared parser for every rescue
+description_parser = DescriptionParser()
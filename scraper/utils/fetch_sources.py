@@ -0,0 +1,128 @@
+import contextvars
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_SOURCE_TIMEOUT = 120 # seconds
+START_POLL_INTERVAL = 1 # seconds between checks for sources that waited on a worker starting
+
+# How a source's scrape went. Only a successful scrape is complete enough to archive the
+# rescue's dogs that are missing from it.
+SUCCESS = 'success'
+PARTIAL = 'partial'
+FAILED = 'failed'
+
+# Label of the source running in this thread, so stats can be kept per source
+_current_source = contextvars.ContextVar('current_source', default=None)
+
+def source_result(dogs, status=SUCCESS, error=None):
+    '''
+    What a rescue source returns.
+
+    Args:
+        dogs: List of dogs scraped
+        status: SUCCESS, PARTIAL if some dogs may be missing, or FAILED
+        error: Optional message on what went wrong
+
+    Returns:
+        dict: 'dogs', 'status' and 'error'
+    '''
+    return {'dogs': dogs, 'status': status, 'error': error}
+
+def current_source():
+    '''Label of the source being fetched by the calling thread, None outside fetch_sources.'''
+    return _current_source.get()
+
+def fetch_sources(sources, max_workers=None, timeout=None):
+    '''
+    Run rescue scrapers concurrently, each under its own deadline.
+
+    Every source has timeout seconds from when it starts running, so one that waits for a
+    worker doesn't lose that time. A source still running at its deadline fails and is left to
+    finish in the background. It keeps its worker until then, so sources waiting for one start
+    late, but their requests all have timeouts (see utils.transport), so they do start.
+
+    Args:
+        sources: List of (label, pull_function) pairs
+        max_workers: Number of sources fetched at once (SCRAPER_MAX_WORKERS, default 4)
+        timeout: Seconds every source has to finish (SCRAPER_SOURCE_TIMEOUT, default 120)
+
+    Returns:
+        list: One result dict per source, in the order given, with keys
+            - 'source': the source label
+            - 'dogs': list of dogs scraped, [] if the source failed
+            - 'status': SUCCESS, PARTIAL or FAILED, a source that raised or ran out of
+              time failed
+            - 'duration': seconds the source ran for
+            - 'error': error message, if any
+    '''
+
+    max_workers = max_workers or int(os.getenv('SCRAPER_MAX_WORKERS', DEFAULT_MAX_WORKERS))
+    timeout = timeout or float(os.getenv('SCRAPER_SOURCE_TIMEOUT', DEFAULT_SOURCE_TIMEOUT))
+
+    started = {}
+
+    def run(label, pull):
+        started[label] = time.monotonic()
+        print(f'Pulling from {label}')
+        # Worker threads are reused, so the label mustn't outlive the source
+        token = _current_source.set(label)
+        try:
+            return pull()
+        finally:
+            _current_source.reset(token)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='source')
+    futures = {executor.submit(run, label, pull): label for label, pull in sources}
+    results = {}
+    pending = set(futures)
+
+    while pending:
+        now = time.monotonic()
+        deadlines = [started[futures[future]] + timeout for future in pending if futures[future] in started]
+        if len(deadlines) < len(pending):
+            # A source that starts during the wait needs its deadline watched too
+            deadlines.append(now + START_POLL_INTERVAL)
+        done, pending = wait(pending, timeout=max(0, min(deadlines) - now), return_when=FIRST_COMPLETED)
+
+        for future in done:
+            label = futures[future]
+            duration = time.monotonic() - started[label]
+            try:
+                result = future.result()
+                # A source that returns a plain list of dogs got all of them
+                if isinstance(result, list):
+                    result = source_result(result)
+                results[label] = _result(label, result['dogs'], result['status'], duration, result['error'])
+            except Exception as e:
+                results[label] = _result(label, [], FAILED, duration, repr(e))
+
+        now = time.monotonic()
+        for future in list(pending):
+            label = futures[future]
+            if label in started and now >= started[label] + timeout:
+                results[label] = _result(label, [], FAILED, now - started[label], f'No result after {timeout:g}s')
+                pending.remove(future)
+
+    # Sources that blew their deadline can't be killed, so don't wait on them here. Their
+    # requests all have timeouts (see utils.transport), so they can't keep the run alive.
+    executor.shutdown(wait=False)
+
+    ordered = [results[label] for label, _ in sources]
+    for result in ordered:
+        message = f'{result["source"]}: {result["status"]}, {len(result["dogs"])} dogs in {result["duration"]:.1f}s'
+        if result['error']:
+            message += f' ({result["error"]})'
+        print(message)
+
+    return ordered
+
+def _result(label, dogs, status, duration, error=None):
+    return {
+        'source': label,
+        'dogs': dogs,
+        'status': status,
+        'duration': duration,
+        'error': error,
+    }
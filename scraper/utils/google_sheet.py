@@ -1,182 +1,694 @@
 
+import hashlib
 import json
 import os
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
 
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
+from utils import transport
+from utils.sheets_quota import QuotaHTTPClient
+from utils.state_store import StateStore
 
 CURRENT_SHEET_NAME = 'Current'
 ARCHIVE_SHEET_NAME = 'Archive'
 LOGS_SHEET_NAME = 'Logs'
 
+# Hidden column L of the Current sheet holds a hash of each row's scraped fields
+FINGERPRINT_HEADER = 'Fingerprint'
+FINGERPRINT_COLUMN = 'L'
+FINGERPRINT_FIELDS = ['Name', 'Breed', 'Age', 'Gender', 'Weight', 'Description']
+
+# A rescue losing more than this share of its dogs in one run looks like a broken scrape,
+# so the archiving is held back and logged for review instead
+DEFAULT_MAX_DROP_FRACTION = 0.5
+MIN_HELD_DROP = 5 # Fewer dogs than this leaving at once is never held
+MAX_SYNC_ATTEMPTS = 5 # Reads of a sheet that keeps changing before a sync gives up on it
+
+# One authorized client and the spreadsheets opened with it are shared by the whole run
+_client = None
+_spreadsheets = {}
+_lock = threading.Lock()
+
+def get_google_client():
+    '''
+    Authenticate once and return the shared gspread client.
+
+    Every call made with the client is rate limited and retried by QuotaHTTPClient, and
+    times out like the rescue requests do (SCRAPER_HTTP_CONNECT_TIMEOUT and
+    SCRAPER_HTTP_READ_TIMEOUT).
+    If GOOGLE_SHEETS_CACHE points at a file, a still valid access token saved there by
+    an earlier run is reused instead of doing a new token exchange.
+    '''
+    global _client
+
+    with _lock:
+        if _client is not None:
+            return _client
+
+        creds_json = os.getenv('GOOGLE_CREDENTIALS')
+
+        if not creds_json:
+            raise ValueError('GOOGLE_CREDENTIALS environment variable not set')
+
+        creds_dict = json.loads(creds_json)
+
+        scope = [
+            'https://spreadsheets.google.com/feeds',
+            'https://www.googleapis.com/auth/drive',
+        ]
+        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
+        client = gspread.authorize(creds, http_client=QuotaHTTPClient)
+        # gspread waits forever by default, so a hung call would hang the whole run
+        client.set_timeout(transport.default_timeout())
+
+        cache = _read_cache(creds_dict.get('client_email', ''))
+        if cache.get('token') and cache.get('expiry'):
+            expiry = datetime.fromisoformat(cache['expiry'])
+            if expiry - timedelta(minutes=5) > datetime.utcnow():
+                client.http_client.auth.token = cache['token']
+                client.http_client.auth.expiry = expiry
+
+        _client = client
+        return _client
+
 def get_google_spreadsheet(sheet_name=None):
     '''
     Authenticate and return the Google Sheet.
     Uses ENVIRONMENT variable to determine which sheet to use:
     - 'production' or unset: uses production sheet
     - 'development': uses test sheet
-    '''
-
-    creds_json = os.getenv('GOOGLE_CREDENTIALS')
-
-    if not creds_json:
-        raise ValueError('GOOGLE_CREDENTIALS environment variable not set')
-
-    creds_dict = json.loads(creds_json)
 
-    scope = [
-        'https://spreadsheets.google.com/feeds',
-        'https://www.googleapis.com/auth/drive',
-    ]
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-    client = gspread.authorize(creds)
+    Spreadsheets are cached by title for the rest of the run. With GOOGLE_SHEETS_CACHE set,
+    the spreadsheet key is also saved so later runs open it by key without a Drive search.
+    '''
 
     # Determine which spreadsheet to use based on environment
     environment = os.getenv('ENVIRONMENT', 'development').lower()
 
     if sheet_name:
         print(f'Using specified sheet: {sheet_name}')
-        spreadsheet = client.open(sheet_name)
-        return spreadsheet
-
-    if environment == 'production':
+    elif environment == 'production':
         sheet_name = 'Fido Foster Dogs Database'
         print(f'Using PRODUCTION sheet: {sheet_name}')
     else:
         sheet_name = os.getenv('DEV_SHEET_NAME', 'Fido Foster Dogs Database - TEST')
         print(f'Using DEVELOPMENT sheet: {sheet_name}')
 
-    spreadsheet = client.open(sheet_name)
+    with _lock:
+        if sheet_name in _spreadsheets:
+            return _spreadsheets[sheet_name]
+
+    client = get_google_client()
+    client_email = client.http_client.auth.service_account_email
+    key = _read_cache(client_email).get('keys', {}).get(sheet_name)
+
+    spreadsheet = None
+    if key:
+        try:
+            spreadsheet = client.open_by_key(key)
+        except (gspread.SpreadsheetNotFound, PermissionError):
+            # Sheet was deleted or unshared since the key was saved, look it up again
+            spreadsheet = None
+
+    if spreadsheet is None:
+        spreadsheet = client.open(sheet_name)
+
+    with _lock:
+        _spreadsheets[sheet_name] = spreadsheet
+        _write_cache(client_email, sheet_name, spreadsheet.id, client.http_client.auth)
+
     return spreadsheet
 
-def update_sheet_with_dogs(spreadsheet: gspread.Spreadsheet, dogs):
-    '''Update Google Sheet with scraped dog data.'''
+def sheets_quota_summary():
+    '''How the shared client fared against the Sheets quota, or None if it wasn't used.'''
+    if _client is None or not isinstance(_client.http_client, QuotaHTTPClient):
+        return None
+    return _client.http_client.summary()
+
+def sheets_quota_stats():
+    '''QuotaHTTPClient.stats() of the shared client, or None if it wasn't used.'''
+    if _client is None or not isinstance(_client.http_client, QuotaHTTPClient):
+        return None
+    return _client.http_client.stats()
+
+def append_log(spreadsheet: gspread.Spreadsheet, message, details):
+    '''Add a row to the Logs sheet, in the same form as the sync's own log rows.'''
+    time_now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    spreadsheet.worksheet(LOGS_SHEET_NAME).append_row([time_now, message, json.dumps(details)])
+
+def read_sheet_records(spreadsheet: gspread.Spreadsheet, columns, stop_column=None, stop_at=None):
+    '''
+    Read some columns of a spreadsheet's first sheet as records, like get_all_records.
+
+    The header row is read first, then one batch_get of just the columns asked for. Records
+    are built row by row and reading stops at the first row whose stop_column is stop_at,
+    which isn't included. Values are numericised the same way get_all_records does it.
+
+    Args:
+        spreadsheet: Spreadsheet to read
+        columns: Header names of the columns needed, headers missing from the sheet read as ''
+        stop_column: Header of the column to check for stop_at
+        stop_at: Value that ends the rows to read
+
+    Returns:
+        list: One dict per row, keyed by the headers in columns
+    '''
+
+    header_range = spreadsheet.values_batch_get(['1:1'])['valueRanges'][0]
+    header = header_range.get('values', [[]])[0]
+
+    # The first column with each header wins
+    positions = {}
+    for idx, name in enumerate(header):
+        positions.setdefault(name, idx)
+
+    found = [name for name in dict.fromkeys(columns) if name in positions]
+    if not found:
+        return []
+
+    letters = [gspread.utils.rowcol_to_a1(1, positions[name] + 1)[:-1] for name in found]
+    value_ranges = spreadsheet.values_batch_get(
+        [f'{letter}2:{letter}' for letter in letters],
+        params={'majorDimension': 'COLUMNS'},
+    )['valueRanges']
+    values = [value_range.get('values', [[]])[0] for value_range in value_ranges]
+
+    records = []
+    for idx in range(max(len(column) for column in values)):
+        row = gspread.utils.numericise_all([column[idx] if idx < len(column) else '' for column in values])
+        record = dict.fromkeys(columns, '')
+        record.update(zip(found, row))
+        if stop_column is not None and record.get(stop_column) == stop_at:
+            break
+        records.append(record)
+
+    return records
+
+def _read_cache(client_email):
+    '''Read the GOOGLE_SHEETS_CACHE file, ignoring it if it belongs to another account.'''
+    path = os.getenv('GOOGLE_SHEETS_CACHE')
+    if not path or not os.path.exists(path):
+        return {}
+
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if cache.get('client_email') != client_email:
+        return {}
+    return cache
+
+def _write_cache(client_email, sheet_name, key, auth):
+    '''Save a spreadsheet key and the current access token to GOOGLE_SHEETS_CACHE.'''
+    path = os.getenv('GOOGLE_SHEETS_CACHE')
+    if not path:
+        return
+
+    cache = _read_cache(client_email)
+    cache['client_email'] = client_email
+    cache.setdefault('keys', {})[sheet_name] = key
+    if auth.token and auth.expiry:
+        cache['token'] = auth.token
+        cache['expiry'] = auth.expiry.isoformat()
+
+    # The file holds a live access token, keep it private to this user
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(cache, f)
+
+def update_sheet_with_dogs(spreadsheet: gspread.Spreadsheet, dogs, rescue_names=None, partitions=None):
+    '''
+    Update Google Sheet with scraped dog data.
+
+    Each rescue's rows are diffed on their own. partitions limits the sync to those rescues,
+    so a single rescue refresh leaves every other rescue's rows alone. rescue_names limits
+    archiving to dogs from those rescues, so a run where some failed leaves their dogs
+    alone. Both default to every rescue in the sheet. A rescue losing more than
+    SCRAPER_MAX_DROP_FRACTION (default 0.5) of its dogs at once keeps them and gets a row
+    in the Logs sheet, set it to 1 to let it through.
+
+    Rows are updated and deleted by number, and a delete moves every row below it, whichever
+    rescue it belongs to. So just before writing, the revision is checked again, and if the
+    sheet was modified since it was read, by hand or by a sync of other rescues, it is read
+    and diffed again until it holds still. The updates, archives and deletes then go in a
+    single request, leaving only the time of that one call for another writer to move rows.
+
+    With SCRAPER_STATE_DB set, the rows are diffed against the local state store instead
+    of the sheet whenever the sheet hasn't been modified since the last sync. After a sync
+    that wrote anything, the key columns are read again for the store.
+
+    Returns:
+        dict: Number of dogs 'added', 'archived' and 'updated', and 'logged' rows
+    '''
     current = spreadsheet.worksheet(CURRENT_SHEET_NAME)
-    archive = spreadsheet.worksheet(ARCHIVE_SHEET_NAME)
-    logs = spreadsheet.worksheet(LOGS_SHEET_NAME)
-    existing_dogs = current.get_all_records()
-
-    # Build lookup dictionary using composite key: (Their_Id, Rescue_Name) -> (index, dog_data)
-    # This allows different rescues to have the same ID without conflicts
-    existing_lookup = {
-        (str(dog.get('Their_Id', '')), str(dog.get('Rescue_Name', ''))): (idx, dog)
-        for idx, dog in enumerate(existing_dogs)
-        if dog.get('Their_Id', '') and dog.get('Rescue_Name', '')
-    }
+    store = StateStore.from_env()
+    revision = spreadsheet.get_lastUpdateTime()
 
-    # Track which dogs from the sheet are found in the current scrape
-    # Start with all existing keys, we'll remove them as we see them
-    existing_keys = set(existing_lookup.keys())
-    incoming_keys = set()
+    existing_dogs = None
+    if store:
+        existing_dogs = store.load(spreadsheet.id, revision)
+        if existing_dogs is not None:
+            print('Sheet unchanged since last sync, using local state')
+    if existing_dogs is None:
+        existing_dogs = read_current_index(current)
 
-    new_dogs_count = 0
-    updated_dogs_count = 0
-    removed_dogs_count = 0
     time_now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    max_drop_fraction = float(os.getenv('SCRAPER_MAX_DROP_FRACTION', DEFAULT_MAX_DROP_FRACTION))
+    change_set = compute_change_set(existing_dogs, dogs, time_now, rescue_names, max_drop_fraction, partitions)
+
+    # Rows are written by number and a manual edit must not be overwritten, so the rows only
+    # hold if nothing has written to the sheet since it was read. The revision is checked
+    # after the last read, right before writing, and the sheet is diffed again if it moved
+    archive = None
+    attempts = 1
+    while change_set['updates'] or change_set['deletes']:
+        if change_set['deletes'] and archive is None:
+            archive = spreadsheet.worksheet(ARCHIVE_SHEET_NAME)
+        change_set['archives'] = read_rows(current, change_set['deletes'])
+
+        latest = spreadsheet.get_lastUpdateTime()
+        if latest == revision:
+            break
+        if attempts >= MAX_SYNC_ATTEMPTS:
+            raise RuntimeError(f'Sheet changed during each of {attempts} reads, nothing was written')
+
+        print('Sheet changed during the sync, reading it again')
+        attempts += 1
+        revision = latest
+        existing_dogs = read_current_index(current)
+        change_set = compute_change_set(existing_dogs, dogs, time_now, rescue_names, max_drop_fraction, partitions)
+
+    if store:
+        if any(change_set.values()):
+            # If applying fails part way the saved state is wrong, so the next run reads the sheet
+            store.forget(spreadsheet.id)
+            apply_change_set(spreadsheet, change_set, current=current, archive=archive)
+            # Appended rows can land in any blank gap and others may have written too, so save
+            # what the sheet really holds. The revision comes first, so a write between the two
+            # reads only makes the next run read the sheet again.
+            revision = spreadsheet.get_lastUpdateTime()
+            existing_dogs = read_current_index(current)
+        store.save(spreadsheet.id, existing_dogs, revision)
+        store.close()
+    else:
+        apply_change_set(spreadsheet, change_set, current=current, archive=archive)
+
+    print(f'Added {len(change_set["inserts"])} new dogs')
+    print(f'Moved {len(change_set["archives"])} unavailable dogs to archive')
+    print(f'Updated {len(change_set["updates"])} existing dogs')
+
+    return {
+        'added': len(change_set['inserts']),
+        'archived': len(change_set['archives']),
+        'updated': len(change_set['updates']),
+        'logged': len(change_set['logs']),
+    }
+
+def read_current_index(current: gspread.Worksheet, add_fingerprint=True):
+    '''
+    Read just the key, Manually_Edited and fingerprint columns of the Current sheet.
+
+    Adds the hidden fingerprint column the first time it runs against a sheet without one,
+    unless add_fingerprint is False. Rows without a fingerprint, written before the column
+    existed, get one made from their own values, so they aren't all taken as changed and
+    rewritten with a new Last_Updated. Those rows are read in one more call, and their
+    fingerprints written in another unless add_fingerprint is False.
+
+    Returns:
+        list: One dict per sheet row with 'Their_Id', 'Rescue_Name', 'Manually_Edited'
+              and 'Fingerprint' keys
+    '''
+    header, keys, flags = current.batch_get([f'{FINGERPRINT_COLUMN}1', 'H2:I', f'K2:{FINGERPRINT_COLUMN}'])
+
+    if add_fingerprint and (not header or header[0][0] != FINGERPRINT_HEADER):
+        current.update(range_name=f'{FINGERPRINT_COLUMN}1', values=[[FINGERPRINT_HEADER]])
+        current.hide_columns(11, 12)
 
+    existing_dogs = []
+    for idx in range(max(len(keys), len(flags))):
+        rescue_name, their_id = _cells(keys, idx, 2)
+        manually_edited, fingerprint = _cells(flags, idx, 2)
+        existing_dogs.append({
+            'Their_Id': their_id,
+            'Rescue_Name': rescue_name,
+            'Manually_Edited': manually_edited,
+            'Fingerprint': fingerprint,
+        })
+
+    seed_fingerprints(current, existing_dogs, write=add_fingerprint)
+    return existing_dogs
+
+def seed_fingerprints(current: gspread.Worksheet, existing_dogs, write=True):
+    '''
+    Fill in the fingerprint of keyed rows that have none from the row's values, as if the
+    dog had been scraped with them.
+
+    Returns:
+        int: Number of rows given a fingerprint
+    '''
+    row_numbers = [
+        idx + 2 for idx, dog in enumerate(existing_dogs)  # +2 for 1-indexed rows and the header
+        if dog['Their_Id'] and dog['Rescue_Name'] and not dog['Fingerprint']
+    ]
+    if not row_numbers:
+        return 0
+
+    data = []
+    for row_number, row in zip(row_numbers, read_rows(current, row_numbers)):
+        # A:G are the fingerprinted fields, then the image url
+        fingerprint = dog_fingerprint(dict(zip(FINGERPRINT_FIELDS + ['Image_URL'], row)))
+        existing_dogs[row_number - 2]['Fingerprint'] = fingerprint
+        data.append({'range': f'{FINGERPRINT_COLUMN}{row_number}', 'values': [[fingerprint]]})
+
+    if write:
+        print(f'Adding fingerprints to {len(data)} rows without one')
+        current.batch_update(data)
+    return len(data)
+
+def read_current_dogs(spreadsheet: gspread.Spreadsheet):
+    '''
+    Read every row of the Current sheet, manual edits included, as the website shows them.
+
+    Returns:
+        list: One dict per row, keyed by the header row
+    '''
+    values = spreadsheet.worksheet(CURRENT_SHEET_NAME).get_all_values()
+    if not values:
+        return []
+    return [dict(zip(values[0], row)) for row in values[1:]]
+
+def read_rows(current: gspread.Worksheet, row_numbers):
+    '''Read the A:K values of the given Current sheet rows in one call, in the order given.'''
+    if not row_numbers:
+        return []
+
+    # Read contiguous rows as one range
+    blocks = coalesce_rows(row_numbers)
+    ranges = current.batch_get([f'A{start}:K{end}' for start, end in blocks],
+                               value_render_option=gspread.utils.ValueRenderOption.unformatted)
+
+    rows = {}
+    for (start, end), values in zip(blocks, ranges):
+        for row_number in range(start, end + 1):
+            rows[row_number] = _cells(values, row_number - start, 11)
+    return [rows[row_number] for row_number in row_numbers]
+
+def coalesce_rows(row_numbers):
+    '''
+    Merge row numbers into contiguous (start, end) ranges, highest first.
+
+    e.g. [2, 3, 4, 7, 9, 10] -> [(9, 10), (7, 7), (2, 4)]
+    '''
+    blocks = []
+    for row_number in sorted(set(row_numbers), reverse=True):
+        if blocks and blocks[-1][0] == row_number + 1:
+            blocks[-1] = (row_number, blocks[-1][1])
+        else:
+            blocks.append((row_number, row_number))
+    return blocks
+
+def _cells(values, idx, count):
+    '''Get row idx of a range padded to count cells, as Sheets leaves off trailing empty cells and rows.'''
+    row = list(values[idx]) if idx < len(values) else []
+    return row + [''] * (count - len(row))
+
+def dog_fingerprint(dog):
+    '''
+    Hash a scraped dog's fields for change detection.
+
+    The image URL is hashed separately, after a '-', so a scrape missing its image
+    can be told apart from a real change.
+    '''
+    content = json.dumps([str(dog.get(field, '')) for field in FINGERPRINT_FIELDS])
+    image = str(dog.get('Image_URL', ''))
+    return f'{_short_hash(content)}-{_short_hash(image)}'
+
+def _short_hash(value):
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()[:16]
+
+def dog_to_row(dog, time_now):
+    '''Build the A:J values of a Current sheet row from a scraped dog.'''
+    return [
+        dog.get('Name', ''),
+        dog.get('Breed', ''),
+        dog.get('Age', ''),
+        dog.get('Gender', ''),
+        dog.get('Weight', ''),
+        dog.get('Description', ''),
+        dog.get('Image_URL', ''),
+        dog.get('Rescue_Name', ''),
+        dog.get('Their_Id', ''),
+        time_now
+    ]
+
+def partition_index(existing_dogs):
+    '''
+    Group the rows of the Current sheet by rescue, so each rescue can be diffed on its own.
+
+    Rows without a Their_Id or Rescue_Name belong to no rescue and are left out.
+
+    Returns:
+        dict: Rescue_Name -> list of (row_number, dog) in sheet order
+    '''
+    partitions = {}
+    for idx, dog in enumerate(existing_dogs):
+        their_id = str(dog.get('Their_Id', ''))
+        rescue_name = str(dog.get('Rescue_Name', ''))
+        if their_id and rescue_name:
+            partitions.setdefault(rescue_name, []).append((idx + 2, dog))  # +2 for 1-indexed rows and the header
+    return partitions
+
+def compute_change_set(existing_dogs, dogs, time_now, rescue_names=None, max_drop_fraction=None, partitions=None):
+    '''
+    Diff scraped dogs against the rows currently in the sheet.
+
+    Nothing is written here, the returned change set is applied by apply_change_set.
+    Each rescue is a partition of the sheet diffed by diff_partition against only its own
+    rows, so rows of one rescue never affect another's changes. When partitions is given,
+    only those rescues are reconciled and the dogs and rows of any other rescue are left
+    alone. When rescue_names is given, only existing dogs from those rescues can be archived.
+    When max_drop_fraction is given, a rescue that would lose more than that share of its
+    dogs (and at least MIN_HELD_DROP) keeps them all, with a log row saying so.
+
+    Returns:
+        dict: Change set with keys
+            - 'inserts': rows to append to the Current sheet
+            - 'updates': (row_number, row, fingerprint) to overwrite in the Current sheet
+            - 'archives': rows to append to the Archive sheet, left empty here as only
+              the keys of existing dogs are known, update_sheet_with_dogs reads them
+            - 'deletes': Current sheet row numbers to remove
+            - 'logs': rows to append to the Logs sheet
+    '''
+    change_set = empty_change_set()
+
+    incoming = {}
     for dog in dogs:
-        # Create composite key from Their_Id and Rescue_Name
         dog_id = str(dog.get('Their_Id', ''))
         rescue_name = str(dog.get('Rescue_Name', ''))
-        composite_key = (dog_id, rescue_name)
 
         '''
         If for some reason we are missing id or rescue
         We will log it and skip it
         '''
         if not dog_id or not rescue_name:
-            logs.append_row([
+            change_set['logs'].append([
                 time_now,
                 'Missing dog_id or rescue_name',
                 json.dumps(dog)
             ])
             continue
 
-        incoming_keys.add(composite_key)
+        incoming.setdefault(rescue_name, []).append(dog)
+
+    index = partition_index(existing_dogs)
+    if partitions is None:
+        partitions = list(dict.fromkeys(list(index) + list(incoming)))
+    else:
+        skipped = sum(len(rescue_dogs) for rescue_name, rescue_dogs in incoming.items() if rescue_name not in partitions)
+        if skipped:
+            print(f'Skipping {skipped} dogs of rescues outside this sync')
+
+    for rescue_name in dict.fromkeys(partitions):
+        partition = diff_partition(
+            rescue_name,
+            index.get(rescue_name, []),
+            incoming.get(rescue_name, []),
+            time_now,
+            archive=rescue_names is None or rescue_name in rescue_names,
+            max_drop_fraction=max_drop_fraction,
+        )
+        merge_change_set(change_set, partition)
+
+    return change_set
+
+def empty_change_set():
+    return {
+        'inserts': [],
+        'updates': [],
+        'archives': [],
+        'deletes': [],
+        'logs': [],
+    }
+
+def diff_partition(rescue_name, rows, dogs, time_now, archive=True, max_drop_fraction=None):
+    '''
+    Diff one rescue's scraped dogs against that rescue's rows of the sheet.
+
+    Args:
+        rescue_name: Rescue the partition belongs to
+        rows: (row_number, dog) of the rescue's rows, from partition_index
+        dogs: Scraped dogs of the rescue, all with a Their_Id
+        time_now: Timestamp for new and updated rows
+        archive: Whether rows missing from dogs are archived
+        max_drop_fraction: Largest share of the rescue's rows archived without a review
+
+    Returns:
+        dict: Change set of the partition, in the form compute_change_set returns
+    '''
+    change_set = empty_change_set()
+
+    # Their_Id -> (row_number, dog_data), different rescues can share an id as they are
+    # different partitions
+    existing_lookup = {str(dog.get('Their_Id', '')): (row_number, dog) for row_number, dog in rows}
+    incoming_ids = set()
+
+    for dog in dogs:
+        dog_id = str(dog.get('Their_Id', ''))
+        incoming_ids.add(dog_id)
 
         # Add new dog
-        if composite_key not in existing_lookup:
-            current.append_row([
-                dog.get('Name', ''),
-                dog.get('Breed', ''),
-                dog.get('Age', ''),
-                dog.get('Gender', ''),
-                dog.get('Weight', ''),
-                dog.get('Description', ''),
-                dog.get('Image_URL', ''),
-                dog.get('Rescue_Name', ''),
-                dog.get('Their_Id', ''),
-                time_now,
-                'false' # Manually edited
+        if dog_id not in existing_lookup:
+            change_set['inserts'].append(dog_to_row(dog, time_now) + [
+                'false', # Manually edited
+                dog_fingerprint(dog)
             ])
-            new_dogs_count += 1
             continue
 
-        # Else find the existing dog by index
-        idx, existing_dog = existing_lookup[composite_key]
-        row_number = idx + 2  # +2 because sheets are 1-indexed and row 1 is header
+        row_number, existing_dog = existing_lookup[dog_id]
 
         # skip manually edited dogs
         manually_edited = str(existing_dog.get('Manually_Edited', '')).lower()
         if manually_edited != 'false':
             continue
 
-        # Check if any fields have changed
+        # Check if any fields have changed, only considering a new image URL a change if
+        # the new data has one (don't overwrite with blank)
+        fingerprint = dog_fingerprint(dog)
+        content, _, image = str(existing_dog.get('Fingerprint', '')).partition('-')
+        new_content, _, new_image = fingerprint.partition('-')
         has_changes = (
-            existing_dog.get('Name', '') != dog.get('Name', '') or
-            existing_dog.get('Breed', '') != dog.get('Breed', '') or
-            str(existing_dog.get('Age', '')) != str(dog.get('Age', '')) or
-            existing_dog.get('Gender', '') != dog.get('Gender', '') or
-            str(existing_dog.get('Weight', '')) != str(dog.get('Weight', '')) or
-            existing_dog.get('Description', '') != dog.get('Description', '') or
-            (existing_dog.get('Image_URL', '') != dog.get('Image_URL', '') and
-            dog.get('Image_URL', '') != '') # Only consider it a change if the new data has an image URL (don't overwrite with blank)
+            content != new_content or
+            (image != new_image and dog.get('Image_URL', '') != '')
         )
 
         if has_changes:
             # Update the entire row with new data
-            current.update(range_name=f'A{row_number}:J{row_number}', values=[[
-                dog.get('Name', ''),
-                dog.get('Breed', ''),
-                dog.get('Age', ''),
-                dog.get('Gender', ''),
-                dog.get('Weight', ''),
-                dog.get('Description', ''),
-                dog.get('Image_URL', ''),
-                dog.get('Rescue_Name', ''),
-                dog.get('Their_Id', ''),
-                time_now
-            ]])
-            updated_dogs_count += 1
+            change_set['updates'].append((row_number, dog_to_row(dog, time_now), fingerprint))
+
+    if not archive:
+        return change_set
 
     # Find dogs that are no longer available (in sheet but not in incoming scrape)
-    removed_keys = existing_keys - incoming_keys
-
-    # Move removed dogs to archive sheet (in reverse order to maintain row numbers)
-    for key in sorted(removed_keys, key=lambda k: existing_lookup[k][0], reverse=True):
-        idx, dog_data = existing_lookup[key]
-        row_number = idx + 2
-
-        # Add to archive sheet
-        archive.append_row([
-            dog_data.get('Name', ''),
-            dog_data.get('Breed', ''),
-            dog_data.get('Age', ''),
-            dog_data.get('Gender', ''),
-            dog_data.get('Weight', ''),
-            dog_data.get('Description', ''),
-            dog_data.get('Image_URL', ''),
-            dog_data.get('Rescue_Name', ''),
-            dog_data.get('Their_Id', ''),
-            dog_data.get('Last_Updated', ''),
-            dog_data.get('Manually_Edited', '')
+    removed_ids = set(existing_lookup) - incoming_ids
+    if (max_drop_fraction is not None and len(removed_ids) >= MIN_HELD_DROP
+            and len(removed_ids) > max_drop_fraction * len(existing_lookup)):
+        print(f'Holding back archiving {len(removed_ids)} {rescue_name} dogs for review')
+        change_set['logs'].append([
+            time_now,
+            'Large drop held for review',
+            json.dumps({'Rescue_Name': rescue_name, 'Held': len(removed_ids),
+                        'Existing': len(existing_lookup)})
         ])
+        return change_set
+
+    for dog_id in removed_ids:
+        row_number, _ = existing_lookup[dog_id]
+        change_set['deletes'].append(row_number)
+    # Deletes are kept in reverse order so row numbers stay valid
+    change_set['deletes'].sort(reverse=True)
+
+    return change_set
 
-        # Delete from main sheet
-        current.delete_rows(row_number)
-        removed_dogs_count += 1
+def merge_change_set(change_set, partition):
+    '''Add a partition's change set to a combined one, keeping the deletes in reverse order.'''
+    for kind in ('inserts', 'updates', 'archives', 'logs'):
+        change_set[kind].extend(partition[kind])
+    change_set['deletes'] = sorted(change_set['deletes'] + partition['deletes'], reverse=True)
+
+def apply_change_set(spreadsheet: gspread.Spreadsheet, change_set, current=None, archive=None):
+    '''
+    Write a change set from compute_change_set to the spreadsheet.
+
+    Uses at most one API call per sheet written, no matter how many dogs changed. The rows
+    written by number, updates then archives and deletes, go first and in one request, so
+    they land all at once or not at all and nothing can move the rows between them.
+    '''
+    if current is None:
+        current = spreadsheet.worksheet(CURRENT_SHEET_NAME)
+
+    requests = []
+    for row_number, row, fingerprint in change_set['updates']:
+        # Manually_Edited (K) sits between the row and its fingerprint, so leave it alone
+        requests.append(_update_cells(current.id, row_number, 'A', row))
+        requests.append(_update_cells(current.id, row_number, FINGERPRINT_COLUMN, [fingerprint]))
+
+    if change_set['archives']:
+        if archive is None:
+            archive = spreadsheet.worksheet(ARCHIVE_SHEET_NAME)
+        requests.append({
+            'appendCells': {
+                'sheetId': archive.id,
+                'rows': [{'values': [_cell_data(value) for value in row]} for row in change_set['archives']],
+                'fields': 'userEnteredValue',
+            }
+        })
+
+    # Contiguous rows go in one delete, highest first so each delete doesn't shift the ones after it
+    for start, end in coalesce_rows(change_set['deletes']):
+        requests.append({
+            'deleteDimension': {
+                'range': {
+                    'sheetId': current.id,
+                    'dimension': 'ROWS',
+                    'startIndex': start - 1,
+                    'endIndex': end,
+                }
+            }
+        })
+
+    if requests:
+        spreadsheet.batch_update({'requests': requests})
+
+    if change_set['logs']:
+        spreadsheet.worksheet(LOGS_SHEET_NAME).append_rows(change_set['logs'])
+
+    if change_set['inserts']:
+        current.append_rows(change_set['inserts'])
+
+def _update_cells(sheet_id, row_number, column, values):
+    '''An updateCells request writing values across a row from column, e.g. 'A'.'''
+    return {
+        'updateCells': {
+            'start': {
+                'sheetId': sheet_id,
+                'rowIndex': row_number - 1,
+                'columnIndex': gspread.utils.column_letter_to_index(column) - 1,
+            },
+            'rows': [{'values': [_cell_data(value) for value in values]}],
+            'fields': 'userEnteredValue',
+        }
+    }
 
-    print(f'Added {new_dogs_count} new dogs')
-    print(f'Moved {removed_dogs_count} unavailable dogs to archive')
-    print(f'Updated {updated_dogs_count} existing dogs')
+def _cell_data(value):
+    '''Wrap a value as Sheets CellData, keeping it as is like a RAW append would.'''
+    if value is None:
+        return {}
+    if isinstance(value, bool):
+        return {'userEnteredValue': {'boolValue': value}}
+    if isinstance(value, (int, float)):
+        return {'userEnteredValue': {'numberValue': value}}
+    return {'userEnteredValue': {'stringValue': str(value)}}
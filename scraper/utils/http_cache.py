@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from utils import transport
+from utils.fetch_sources import current_source
+
+# Parse time and cache hits for this run, by source label, or by host outside fetch_sources
+_parse_stats = {}
+_lock = threading.Lock()
+
+
+def fetch_parsed(url, parse, params=None, headers=None, timeout=None):
+    '''
+    GET a url and return parse(response).
+
+    When SCRAPER_HTTP_CACHE is set to a directory, the ETag/Last-Modified headers, a hash of
+    the body and the parsed result are saved there. The next fetch of the same url is sent as a
+    conditional request, and if the server answers 304 or the body hashes the same as last
+    time, the saved result is returned without calling parse. Parsed results must be JSON
+    serializable. Time spent parsing is kept for parse_stats().
+
+    Args:
+        url: Url to fetch
+        parse: Function taking the requests.Response and returning the parsed result
+        params: Optional query parameters
+        headers: Optional request headers
+        timeout: Optional request timeout, the shared transport's by default
+
+    Returns:
+        The parsed result, either fresh or from the cache
+    '''
+
+    cache_dir = os.getenv('SCRAPER_HTTP_CACHE')
+    if not cache_dir:
+        response = transport.get(url, params=params, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return _timed_parse(url, parse, response)
+
+    path = os.path.join(cache_dir, _cache_key(url, params) + '.json')
+    entry = _load_entry(path)
+
+    request_headers = dict(headers or {})
+    if entry.get('etag'):
+        request_headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        request_headers['If-Modified-Since'] = entry['last_modified']
+
+    response = transport.get(url, params=params, headers=request_headers, timeout=timeout)
+
+    if response.status_code == 304 and 'parsed' in entry:
+        print(f'Not modified since last run: {url}')
+        _record(url, cache_hit=True)
+        return entry['parsed']
+
+    response.raise_for_status()
+
+    content_hash = hashlib.sha256(response.content).hexdigest()
+    if entry.get('content_hash') == content_hash and 'parsed' in entry:
+        print(f'Unchanged since last run: {url}')
+        _record(url, cache_hit=True)
+        parsed = entry['parsed']
+    else:
+        parsed = _timed_parse(url, parse, response)
+
+    _save_entry(path, {
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'content_hash': content_hash,
+        'parsed': parsed,
+    })
+
+    return parsed
+
+def parse_stats():
+    '''
+    Returns:
+        dict: Source label -> 'parses' run, 'seconds' spent in them and 'cache_hits' that
+              skipped one. Fetches made outside fetch_sources are under their host instead
+    '''
+    with _lock:
+        return {key: dict(stats) for key, stats in _parse_stats.items()}
+
+def _timed_parse(url, parse, response):
+    start = time.monotonic()
+    try:
+        return parse(response)
+    finally:
+        _record(url, seconds=time.monotonic() - start)
+
+def _record(url, seconds=None, cache_hit=False):
+    with _lock:
+        key = current_source() or urlsplit(url).netloc
+        stats = _parse_stats.setdefault(key, {'parses': 0, 'seconds': 0.0, 'cache_hits': 0})
+        if seconds is not None:
+            stats['parses'] += 1
+            stats['seconds'] += seconds
+        stats['cache_hits'] += cache_hit
+
+def _cache_key(url, params):
+    raw = json.dumps([url, params or {}], sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def _load_entry(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_entry(path, entry):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename so a crash mid-write can't leave a truncated entry behind
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, path)
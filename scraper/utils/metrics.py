@@ -0,0 +1,101 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+from utils import transport
+from utils.fetch_sources import SUCCESS
+from utils.google_sheet import sheets_quota_stats
+from utils.http_cache import parse_stats
+
+try:
+    import resource
+except ImportError:
+    resource = None # Not on Windows
+
+METRICS_VERSION = 1
+
+@contextmanager
+def timed(stages, name):
+    '''Add the seconds the with block takes to stages[name].'''
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        stages[name] = round(stages.get(name, 0) + time.monotonic() - start, 3)
+
+def peak_memory_mb():
+    '''The most memory this process has held at once, or None where that isn't known.'''
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def build_run_metrics(started, wall_seconds, stages, sources, sync=None):
+    '''
+    Gather everything measured during a run into one JSON serializable record.
+
+    Args:
+        started: When the run started, as an ISO 8601 string
+        wall_seconds: How long the whole run took
+        stages: Stage name -> seconds, as filled in by timed()
+        sources: Results from fetch_sources
+        sync: Optional counts returned by update_sheet_with_dogs
+
+    Returns:
+        dict: The run's metrics, with per source results and parse time, HTTP requests by
+              host, Sheets API calls, bytes and throttling, and the sync's row counts
+    '''
+    return {
+        'version': METRICS_VERSION,
+        'started': started,
+        'environment': os.getenv('ENVIRONMENT', 'development').lower(),
+        'wall_seconds': round(wall_seconds, 3),
+        'peak_memory_mb': peak_memory_mb(),
+        'stages': stages,
+        'sources': [
+            {
+                'source': result['source'],
+                'status': result['status'],
+                'dogs': len(result['dogs']),
+                'seconds': round(result['duration'], 3),
+                'error': result['error'],
+            }
+            for result in sources
+        ],
+        'http': _rounded(transport.host_stats()),
+        'parse': _rounded(parse_stats()),
+        'sheets': sheets_quota_stats(),
+        'sync': sync,
+    }
+
+def summarize_run(run):
+    '''The headline numbers of a run's metrics, small enough for one Logs sheet row.'''
+    sheets = run['sheets'] or {}
+    return {
+        'wall_seconds': run['wall_seconds'],
+        'peak_memory_mb': run['peak_memory_mb'],
+        'dogs': sum(source['dogs'] for source in run['sources']),
+        'not_successful': [source['source'] for source in run['sources'] if source['status'] != SUCCESS],
+        'http_requests': sum(host['requests'] for host in run['http'].values()),
+        'sheets_reads': sheets.get('reads', 0),
+        'sheets_writes': sheets.get('writes', 0),
+        'throttled_seconds': sheets.get('throttled_seconds', 0),
+        'sync': run['sync'],
+    }
+
+def write_metrics(path, run):
+    '''Append a run's metrics to the metrics history at path as one JSON line.'''
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(run, separators=(',', ':')) + '\n')
+
+def _rounded(stats):
+    return {
+        key: {name: round(value, 3) if isinstance(value, float) else value for name, value in values.items()}
+        for key, values in stats.items()
+    }
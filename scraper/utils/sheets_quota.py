@@ -0,0 +1,150 @@
+import os
+import random
+import threading
+import time
+from http import HTTPStatus
+
+from gspread.exceptions import APIError
+from gspread.http_client import HTTPClient
+
+DEFAULT_READS_PER_MINUTE = 60 # Google's default per-user quota for each
+DEFAULT_WRITES_PER_MINUTE = 60
+MAX_RETRIES = 6
+BACKOFF_BASE = 1 # seconds
+BACKOFF_CAP = 64 # seconds
+
+class TokenBucket:
+    '''
+    Hands out one token per call, refilling at per_minute / 60 tokens a second.
+
+    A full bucket lets a burst of per_minute calls through at once. When it runs dry, each caller
+    reserves the next token and sleeps until it is due, so concurrent callers queue up in order
+    instead of racing for it.
+    '''
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        '''
+        Take a token, waiting for it if needed.
+
+        Returns:
+            float: Seconds spent waiting
+        '''
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+
+        if wait:
+            time.sleep(wait)
+        return wait
+
+class QuotaHTTPClient(HTTPClient):
+    '''
+    gspread HTTP client that keeps every Sheets and Drive call under the per-minute quotas.
+
+    Reads (GET) and writes (everything else) each take a token from their own bucket, sized by
+    SCRAPER_SHEETS_READS_PER_MINUTE and SCRAPER_SHEETS_WRITES_PER_MINUTE. Calls that still hit a
+    rate limit, and reads that hit a server error, are retried with jittered exponential backoff.
+    The time spent waiting either way, and the calls and bytes each way, are kept for summary()
+    and stats().
+    '''
+
+    def __init__(self, auth, session=None):
+        super().__init__(auth, session)
+        self.reads = TokenBucket(int(os.getenv('SCRAPER_SHEETS_READS_PER_MINUTE', DEFAULT_READS_PER_MINUTE)))
+        self.writes = TokenBucket(int(os.getenv('SCRAPER_SHEETS_WRITES_PER_MINUTE', DEFAULT_WRITES_PER_MINUTE)))
+        self.stats_lock = threading.Lock()
+        self.calls = 0
+        self.read_calls = 0
+        self.write_calls = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.throttled = 0.0
+        self.retries = 0
+        self.backoff = 0.0
+
+    def request(self, method, endpoint, *args, **kwargs):
+        is_read = method.upper() == 'GET'
+        bucket = self.reads if is_read else self.writes
+
+        attempt = 0
+        while True:
+            waited = bucket.take()
+            with self.stats_lock:
+                self.calls += 1
+                self.read_calls += is_read
+                self.write_calls += not is_read
+                self.throttled += waited
+
+            try:
+                response = super().request(method, endpoint, *args, **kwargs)
+                with self.stats_lock:
+                    self.bytes_sent += len(response.request.body or b'')
+                    self.bytes_received += len(response.content)
+                return response
+            except APIError as error:
+                if attempt >= MAX_RETRIES or not should_retry(error, is_read):
+                    raise
+
+                # Full jitter, so calls that failed together don't all come back together
+                delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                print(f'Sheets API error {error.response.status_code}, retrying in {delay:.1f}s')
+                with self.stats_lock:
+                    self.retries += 1
+                    self.backoff += delay
+                time.sleep(delay)
+                attempt += 1
+
+    def stats(self):
+        '''
+        Returns:
+            dict: 'calls', 'reads', 'writes', 'bytes_sent', 'bytes_received', 'throttled_seconds',
+                  'retries' and 'backoff_seconds' so far, retried calls counted once per try
+        '''
+        with self.stats_lock:
+            return {
+                'calls': self.calls,
+                'reads': self.read_calls,
+                'writes': self.write_calls,
+                'bytes_sent': self.bytes_sent,
+                'bytes_received': self.bytes_received,
+                'throttled_seconds': round(self.throttled, 3),
+                'retries': self.retries,
+                'backoff_seconds': round(self.backoff, 3),
+            }
+
+    def summary(self):
+        '''One line on the calls made and the time spent waiting on the quota and on retries.'''
+        with self.stats_lock:
+            return (f'Sheets API: {self.calls} calls, {self.throttled:.1f}s throttled by the quota, '
+                    f'{self.retries} retries after {self.backoff:.1f}s of backoff')
+
+def should_retry(error, is_read=True):
+    '''
+    Whether a failed call is worth trying again.
+
+    Rate limits mean Google turned the request away, so any call can be retried. Timeouts and
+    server errors can come after a write was already applied, and writing again would delete
+    or append a second set of rows, so only reads are retried on those.
+
+    The status is taken from the response, since APIError.code is -1 when the body isn't JSON,
+    as with the HTML pages of a 502 from Google's front end.
+    '''
+    code = error.response.status_code
+    if code == HTTPStatus.TOO_MANY_REQUESTS:
+        return True
+    if code == HTTPStatus.REQUEST_TIMEOUT or code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+        return is_read
+
+    # Drive reports its rate limits as a 403
+    errors = error.error.get('errors') or [{}]
+    return code == HTTPStatus.FORBIDDEN and errors[0].get('domain') == 'usageLimits'
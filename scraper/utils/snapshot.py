@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+SNAPSHOT_VERSION = 2
+SNAPSHOT_FILE = 'dogs.json'
+MANIFEST_FILE = 'manifest.json'
+# The Current sheet columns the website shows, in snapshot order, then the thumbnail path
+SNAPSHOT_FIELDS = ['Name', 'Breed', 'Age', 'Gender', 'Weight', 'Description', 'Image_URL', 'Rescue_Name', 'Thumbnail']
+# Words in these fields are what the website's search box matches
+SEARCH_FIELDS = ['Name', 'Breed', 'Description']
+# The website's weight filter, each bucket goes up to and including its cutoff in pounds
+WEIGHT_BUCKETS = [('Small', 25), ('Medium', 50), ('Large', 75), ('X-Large', None)]
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+WEIGHT_PATTERN = re.compile(r'\s*([-+]?\d+)')
+
+def build_snapshot(dogs, thumbnails=None):
+    '''
+    Build the website's dogs.json from the rows of the Current sheet.
+
+    Each dog is a list of SNAPSHOT_FIELDS values, all trimmed strings, so once written as
+    compact JSON the file stays small and compresses well. Rows without a name are left out.
+
+    Args:
+        dogs: List of dictionaries keyed by the Current sheet headers
+        thumbnails: Optional Image_URL -> thumbnail path, relative to the snapshot, without
+                    the '-<width>.<ext>' the website adds
+
+    Returns:
+        dict: The snapshot, with 'version', 'fields', 'dogs' and the 'index' from
+              build_search_index
+    '''
+
+    thumbnails = thumbnails or {}
+
+    rows = []
+    for dog in dogs:
+        dog = dict(dog, Thumbnail=thumbnails.get(dog.get('Image_URL', ''), ''))
+        row = [str(dog.get(field, '')).strip() for field in SNAPSHOT_FIELDS]
+        if row[0]:
+            rows.append(row)
+
+    return {
+        'version': SNAPSHOT_VERSION,
+        'fields': SNAPSHOT_FIELDS,
+        'dogs': rows,
+        'index': build_search_index([dict(zip(SNAPSHOT_FIELDS, row)) for row in rows]),
+    }
+
+def build_search_index(dogs):
+    '''
+    Index dogs for the website's search box and filters, so it can filter by intersecting
+    lists of dog ids instead of scanning every description on each keystroke.
+
+    A dog's id is its position in the list. Terms are the lowercase words and numbers in its
+    SEARCH_FIELDS, the facets are its exact Gender and Rescue_Name and its weight bucket.
+
+    Returns:
+        dict: 'terms', term -> sorted dog ids, and 'facets', with 'gender', 'weight' and
+              'rescue' each a value -> sorted dog ids
+    '''
+
+    terms = {}
+    facets = {'gender': {}, 'weight': {}, 'rescue': {}}
+
+    for dog_id, dog in enumerate(dogs):
+        text = ' '.join(dog.get(field, '') for field in SEARCH_FIELDS).lower()
+        for term in set(TOKEN_PATTERN.findall(text)):
+            terms.setdefault(term, []).append(dog_id)
+
+        for facet, value in (('gender', dog.get('Gender', '')),
+                             ('weight', weight_bucket(dog.get('Weight', ''))),
+                             ('rescue', dog.get('Rescue_Name', ''))):
+            if value:
+                facets[facet].setdefault(value, []).append(dog_id)
+
+    return {'terms': dict(sorted(terms.items())), 'facets': facets}
+
+def weight_bucket(weight):
+    '''
+    Name the WEIGHT_BUCKETS bucket a weight falls in, or '' if it has no leading number.
+
+    Like parseInt, only the leading whole number counts, e.g. '45 lbs' is 45.
+    '''
+    match = WEIGHT_PATTERN.match(weight)
+    if not match:
+        return ''
+
+    pounds = int(match.group(1))
+    for name, cutoff in WEIGHT_BUCKETS:
+        if cutoff is None or pounds <= cutoff:
+            return name
+    return ''
+
+def read_manifest(directory):
+    '''The manifest.json in directory, or {} if there isn't a readable one.'''
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def snapshot_revision(directory):
+    '''The sheet revision the snapshot in directory was built from, if it was recorded.'''
+    return read_manifest(directory).get('revision')
+
+def write_snapshot(directory, dogs, thumbnails=None, revision=None):
+    '''
+    Write dogs.json and its manifest.json to directory, see build_snapshot.
+
+    The manifest holds a hash of dogs.json, which the website adds to the snapshot url so
+    browsers can cache it for as long as it doesn't change. It also records the sheet
+    revision the dogs were read at, so the next run can skip reading an unchanged sheet.
+    dogs.json isn't touched when the snapshot is the same as the one already there, and
+    neither is the manifest unless the revision moved.
+
+    Returns:
+        bool: Whether a new snapshot was written
+    '''
+
+    snapshot = build_snapshot(dogs, thumbnails)
+    content = json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    content_hash = hashlib.sha256(content).hexdigest()[:16]
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    manifest = read_manifest(directory)
+
+    if manifest.get('hash') == content_hash:
+        if revision is not None and manifest.get('revision') != revision:
+            manifest['revision'] = revision
+            _write_atomic(manifest_path, json.dumps(manifest, indent=2).encode('utf-8') + b'\n')
+        return False
+
+    os.makedirs(directory, exist_ok=True)
+    _write_atomic(os.path.join(directory, SNAPSHOT_FILE), content)
+    manifest = {
+        'version': SNAPSHOT_VERSION,
+        'file': SNAPSHOT_FILE,
+        'hash': content_hash,
+        'count': len(snapshot['dogs']),
+        'generated': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+    }
+    if revision is not None:
+        manifest['revision'] = revision
+    # The manifest goes last, so it never points at a snapshot that isn't there yet
+    _write_atomic(manifest_path, json.dumps(manifest, indent=2).encode('utf-8') + b'\n')
+    return True
+
+def _write_atomic(path, content):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
@@ -0,0 +1,105 @@
+import os
+import sqlite3
+
+
+class StateStore:
+    '''
+    Local SQLite copy of what the Current sheet looked like after the last sync.
+
+    For every sheet row it keeps the row position, the (Their_Id, Rescue_Name) key,
+    Manually_Edited and the fingerprint of the row's fields, along with the sheet's revision
+    (its Drive modified time) right after the sync. If the revision hasn't moved since, nobody
+    has touched the sheet and the next sync can diff against this copy without reading it.
+    '''
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS rows (
+                    sheet_id TEXT NOT NULL,
+                    row_index INTEGER NOT NULL,
+                    their_id TEXT NOT NULL,
+                    rescue_name TEXT NOT NULL,
+                    manually_edited TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    PRIMARY KEY (sheet_id, row_index)
+                )
+            ''')
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS revisions (
+                    sheet_id TEXT PRIMARY KEY,
+                    revision TEXT NOT NULL
+                )
+            ''')
+
+    @classmethod
+    def from_env(cls):
+        '''Open the store at SCRAPER_STATE_DB, or return None if it isn't set.'''
+        path = os.getenv('SCRAPER_STATE_DB')
+        if not path:
+            return None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return cls(path)
+
+    def load(self, sheet_id, revision):
+        '''
+        Get the saved rows of a sheet, if it is still at the given revision.
+
+        Returns:
+            list: One dict per sheet row like read_current_index, or None if the sheet has
+                  changed since it was saved or was never saved
+        '''
+        saved = self.connection.execute(
+            'SELECT revision FROM revisions WHERE sheet_id = ?', (sheet_id,)
+        ).fetchone()
+        if not saved or saved[0] != revision:
+            return None
+
+        rows = self.connection.execute(
+            'SELECT their_id, rescue_name, manually_edited, fingerprint FROM rows '
+            'WHERE sheet_id = ? ORDER BY row_index',
+            (sheet_id,),
+        )
+        return [
+            {
+                'Their_Id': their_id,
+                'Rescue_Name': rescue_name,
+                'Manually_Edited': manually_edited,
+                'Fingerprint': fingerprint,
+            }
+            for their_id, rescue_name, manually_edited, fingerprint in rows
+        ]
+
+    def save(self, sheet_id, existing_dogs, revision):
+        '''Replace the saved rows of a sheet with existing_dogs, in sheet order.'''
+        with self.connection:
+            self.connection.execute('DELETE FROM rows WHERE sheet_id = ?', (sheet_id,))
+            self.connection.executemany(
+                'INSERT INTO rows VALUES (?, ?, ?, ?, ?, ?)',
+                [
+                    (
+                        sheet_id,
+                        idx,
+                        str(dog.get('Their_Id', '')),
+                        str(dog.get('Rescue_Name', '')),
+                        str(dog.get('Manually_Edited', '')),
+                        str(dog.get('Fingerprint', '')),
+                    )
+                    for idx, dog in enumerate(existing_dogs)
+                ],
+            )
+            self.connection.execute(
+                'INSERT OR REPLACE INTO revisions VALUES (?, ?)', (sheet_id, revision)
+            )
+
+    def forget(self, sheet_id):
+        '''Drop a sheet's revision so the next sync reads the sheet again.'''
+        with self.connection:
+            self.connection.execute('DELETE FROM revisions WHERE sheet_id = ?', (sheet_id,))
+
+    def close(self):
+        self.connection.close()
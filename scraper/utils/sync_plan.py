@@ -0,0 +1,248 @@
+import json
+import os
+from collections import Counter
+
+import gspread
+from utils.google_sheet import (
+    CURRENT_SHEET_NAME,
+    DEFAULT_MAX_DROP_FRACTION,
+    compute_change_set,
+    partition_index,
+    read_current_index,
+    read_rows,
+)
+from utils.sheets_quota import DEFAULT_READS_PER_MINUTE, DEFAULT_WRITES_PER_MINUTE
+from utils.snapshot import snapshot_revision
+from utils.state_store import StateStore
+
+# Columns A:I of the Current sheet, Last_Updated (J) always changes so it isn't diffed
+ROW_FIELDS = ['Name', 'Breed', 'Age', 'Gender', 'Weight', 'Description', 'Image_URL', 'Rescue_Name', 'Their_Id']
+# Longest value shown in a printed plan, the JSON plan has them in full
+MAX_PRINTED_VALUE = 60
+
+def plan_sheet_sync(spreadsheet: gspread.Spreadsheet, dogs, rescue_names=None, partitions=None, scrape_reads=None):
+    '''
+    Work out what update_sheet_with_dogs would do with the same arguments, without writing.
+
+    The sheet is diffed the same way, through the state store when it is up to date, then
+    the rows to be updated or archived are read in one call so the plan can show them.
+    Nothing is written to the sheet or the state store.
+
+    Args:
+        scrape_reads: Sheets API reads the run made before the sync, opening the sheets and
+                      reading the rescues' own, if they were counted
+
+    Returns:
+        dict: Plan with keys
+            - 'inserts': the dogs to add
+            - 'updates': the rows to overwrite, with 'changes' of field -> [old, new]
+            - 'archives': the rows to move to the Archive sheet
+            - 'skipped': scraped dogs and rows left alone, with the 'reason'
+            - 'api_calls': estimate_api_calls() of applying it
+            - 'quota': estimate_quota() of those calls
+    '''
+    current = spreadsheet.worksheet(CURRENT_SHEET_NAME)
+    store = StateStore.from_env()
+    revision = spreadsheet.get_lastUpdateTime()
+
+    existing_dogs = None
+    if store:
+        existing_dogs = store.load(spreadsheet.id, revision)
+        store.close()
+    used_state = existing_dogs is not None
+    if existing_dogs is None:
+        existing_dogs = read_current_index(current, add_fingerprint=False)
+
+    max_drop_fraction = float(os.getenv('SCRAPER_MAX_DROP_FRACTION', DEFAULT_MAX_DROP_FRACTION))
+    change_set = compute_change_set(existing_dogs, dogs, '', rescue_names, max_drop_fraction, partitions)
+
+    update_rows = [row_number for row_number, _, _ in change_set['updates']]
+    rows = dict(zip(update_rows + change_set['deletes'],
+                    read_rows(current, update_rows + change_set['deletes'])))
+
+    plan = {
+        'inserts': [dict(zip(ROW_FIELDS, row)) for row in change_set['inserts']],
+        'updates': [
+            {
+                'row': row_number,
+                'Rescue_Name': str(row[7]),
+                'Their_Id': str(row[8]),
+                'Name': str(row[0]),
+                'changes': field_changes(rows[row_number], row),
+            }
+            for row_number, row, _ in change_set['updates']
+        ],
+        'archives': [
+            {
+                'row': row_number,
+                'Rescue_Name': str(rows[row_number][7]),
+                'Their_Id': str(rows[row_number][8]),
+                'Name': str(rows[row_number][0]),
+            }
+            for row_number in change_set['deletes']
+        ],
+        'skipped': skipped_records(existing_dogs, dogs, change_set, partitions),
+    }
+    # The snapshot is read again whenever the sheet moved since it was written
+    snapshot_dir = os.getenv('SCRAPER_SNAPSHOT_DIR')
+    snapshot = None if not snapshot_dir else snapshot_revision(snapshot_dir) != revision
+    plan['api_calls'] = estimate_api_calls(change_set, used_state, store is not None, snapshot, scrape_reads)
+    plan['quota'] = estimate_quota(plan['api_calls'])
+    return plan
+
+def field_changes(old_row, new_row):
+    '''
+    Compare a Current sheet row with the row that would replace it.
+
+    Returns:
+        dict: Field -> [old, new] of every field in ROW_FIELDS that differs
+    '''
+    return {
+        field: [old, new]
+        for field, old, new in zip(ROW_FIELDS, old_row, new_row)
+        if str(old) != str(new)
+    }
+
+def skipped_records(existing_dogs, dogs, change_set, partitions=None):
+    '''
+    List what a sync leaves alone: dogs without a key, dogs of rescues outside partitions,
+    manually edited rows and rescues whose drop is held for review.
+
+    Returns:
+        list: One dict per record, with a 'reason'
+    '''
+    skipped = []
+    for _, message, details in change_set['logs']:
+        skipped.append(dict(json.loads(details), reason=message))
+
+    edited = {
+        (str(dog.get('Their_Id', '')), rescue_name): row_number
+        for rescue_name, rows in partition_index(existing_dogs).items()
+        for row_number, dog in rows
+        if str(dog.get('Manually_Edited', '')).lower() != 'false'
+    }
+    for dog in dogs:
+        key = (str(dog.get('Their_Id', '')), str(dog.get('Rescue_Name', '')))
+        if not all(key):
+            continue
+        if partitions is not None and key[1] not in partitions:
+            skipped.append({'reason': 'Rescue outside this sync', 'Rescue_Name': key[1],
+                            'Their_Id': key[0], 'Name': dog.get('Name', '')})
+        elif key in edited:
+            skipped.append({'reason': 'Manually edited', 'row': edited[key], 'Rescue_Name': key[1],
+                            'Their_Id': key[0], 'Name': dog.get('Name', '')})
+
+    return skipped
+
+def estimate_api_calls(change_set, used_state=False, has_store=False, snapshot=None, scrape_reads=None):
+    '''
+    Count the Sheets and Drive API calls a run makes to apply a change set and then read the
+    snapshot, on top of the reads it made scraping.
+
+    Calls are split into reads and writes the way QuotaHTTPClient counts them. The one-off
+    calls adding the fingerprint column, and fingerprints to rows without one, aren't included.
+
+    Args:
+        change_set: Change set from compute_change_set
+        used_state: Whether the sheet was diffed against the state store instead of read
+        has_store: Whether SCRAPER_STATE_DB is set
+        snapshot: Whether the snapshot is behind the sheet, None without SCRAPER_SNAPSHOT_DIR
+        scrape_reads: Reads made before the sync, None if they weren't counted
+
+    Returns:
+        dict: 'reads' and 'writes' in all, the 'sync_reads', 'snapshot_reads' and
+              'scrape_reads' they are made of, and the sync's and snapshot's 'by_method'
+    '''
+    reads = Counter(worksheet=1, get_lastUpdateTime=1)
+    writes = Counter()
+
+    if not used_state:
+        reads['batch_get'] += 1
+    if change_set['deletes']:
+        reads['worksheet'] += 1
+        reads['batch_get'] += 1
+    if change_set['updates'] or change_set['deletes']:
+        # The revision is checked again, then the rows written by number go in one request
+        reads['get_lastUpdateTime'] += 1
+        writes['batch_update'] += 1
+
+    if change_set['logs']:
+        reads['worksheet'] += 1
+        writes['append_rows'] += 1
+    if change_set['inserts']:
+        writes['append_rows'] += 1
+    if has_store and any(change_set.values()):
+        # The state store is saved from a fresh read of the sheet
+        reads['get_lastUpdateTime'] += 1
+        reads['batch_get'] += 1
+
+    snapshot_reads = Counter()
+    if snapshot is not None:
+        snapshot_reads['get_lastUpdateTime'] += 1
+        # Any write moves the revision, so the snapshot reads the sheet again
+        if snapshot or any(change_set.values()):
+            snapshot_reads['worksheet'] += 1
+            snapshot_reads['get_all_values'] += 1
+
+    sync_reads = sum(reads.values())
+    return {
+        'reads': sync_reads + sum(snapshot_reads.values()) + (scrape_reads or 0),
+        'writes': sum(writes.values()),
+        'sync_reads': sync_reads,
+        'snapshot_reads': sum(snapshot_reads.values()),
+        'scrape_reads': scrape_reads,
+        'by_method': dict(reads + snapshot_reads + writes),
+    }
+
+def estimate_quota(api_calls):
+    '''
+    How much of the per-minute Sheets quotas a number of API calls uses.
+
+    Returns:
+        dict: 'reads_per_minute' and 'writes_per_minute' allowed, and the share of each used
+    '''
+    reads_per_minute = int(os.getenv('SCRAPER_SHEETS_READS_PER_MINUTE', DEFAULT_READS_PER_MINUTE))
+    writes_per_minute = int(os.getenv('SCRAPER_SHEETS_WRITES_PER_MINUTE', DEFAULT_WRITES_PER_MINUTE))
+    return {
+        'reads_per_minute': reads_per_minute,
+        'writes_per_minute': writes_per_minute,
+        'read_share': round(api_calls['reads'] / reads_per_minute, 3),
+        'write_share': round(api_calls['writes'] / writes_per_minute, 3),
+    }
+
+def format_plan(plan):
+    '''Render a plan as readable lines, long values cut short.'''
+    lines = [
+        f'Plan: {len(plan["inserts"])} to add, {len(plan["updates"])} to update, '
+        f'{len(plan["archives"])} to archive, {len(plan["skipped"])} skipped'
+    ]
+
+    for dog in plan['inserts']:
+        lines.append(f'+ {dog["Rescue_Name"]} {dog["Their_Id"]} {dog["Name"]}')
+    for dog in plan['updates']:
+        lines.append(f'~ {dog["Rescue_Name"]} {dog["Their_Id"]} {dog["Name"]} (row {dog["row"]})')
+        for field, (old, new) in dog['changes'].items():
+            lines.append(f'    {field}: {_shorten(old)} -> {_shorten(new)}')
+    for dog in plan['archives']:
+        lines.append(f'- {dog["Rescue_Name"]} {dog["Their_Id"]} {dog["Name"]} (row {dog["row"]})')
+    for record in plan['skipped']:
+        details = ', '.join(f'{key}={_shorten(value)}' for key, value in record.items() if key != 'reason')
+        lines.append(f'! {record["reason"]}: {details}')
+
+    calls = plan['api_calls']
+    quota = plan['quota']
+    if calls['scrape_reads'] is None:
+        scraping = 'not counting the reads made scraping'
+    else:
+        scraping = f'{calls["scrape_reads"]} scraping'
+    lines.append(
+        f'Sheets API: about {calls["reads"]} reads ({calls["sync_reads"]} syncing, '
+        f'{calls["snapshot_reads"]} for the snapshot, {scraping}) and {calls["writes"]} writes, '
+        f'{quota["read_share"]:.0%} of the {quota["reads_per_minute"]} reads and '
+        f'{quota["write_share"]:.0%} of the {quota["writes_per_minute"]} writes allowed per minute'
+    )
+    return '\n'.join(lines)
+
+def _shorten(value):
+    value = repr(value)
+    return value if len(value) <= MAX_PRINTED_VALUE else value[:MAX_PRINTED_VALUE - 3] + '...'
@@ -0,0 +1,136 @@
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from utils import transport
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# Cards show images at most about 400x300, the larger size is for high density screens
+THUMBNAIL_SIZES = [(400, 300), (800, 600)]
+THUMBNAIL_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+INDEX_FILE = 'index.json'
+DEFAULT_WORKERS = 8
+THUMBNAIL_FILE_PATTERN = re.compile(r'^([0-9a-f]{16})-\d+\.(?:webp|jpg)$')
+
+def build_thumbnails(directory, image_urls, max_workers=None):
+    '''
+    Download dog images concurrently and write resized thumbnails of them to directory.
+
+    Thumbnails are named after a hash of the image they came from, as '<hash>-<width>.webp' and
+    '<hash>-<width>.jpg' for each of THUMBNAIL_SIZES, cropped to fill the size. The directory's
+    index.json remembers each url's hash and ETag/Last-Modified headers, so an image is fetched
+    with a conditional request and only resized again when its url or its content is new.
+    Thumbnails no url uses any more are deleted.
+
+    Args:
+        directory: Directory for the thumbnails and their index
+        image_urls: Image urls, blanks and repeats are skipped
+        max_workers: Number of images downloaded at once (SCRAPER_THUMBNAIL_WORKERS, default 8)
+
+    Returns:
+        dict: Image url -> thumbnail hash, for every image that has thumbnails
+    '''
+
+    if Image is None:
+        print('Pillow is not installed, skipping thumbnails')
+        return {}
+
+    max_workers = max_workers or int(os.getenv('SCRAPER_THUMBNAIL_WORKERS', DEFAULT_WORKERS))
+    os.makedirs(directory, exist_ok=True)
+    index_path = os.path.join(directory, INDEX_FILE)
+    index = _load_index(index_path)
+
+    urls = sorted({url for url in image_urls if url and url.startswith(('http://', 'https://'))})
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='thumbnail') as executor:
+        entries = executor.map(lambda url: _thumbnail(directory, url, index.get(url, {})), urls)
+        index = {url: entry for url, entry in zip(urls, entries) if entry}
+
+    used = {entry['hash'] for entry in index.values()}
+    for name in os.listdir(directory):
+        match = THUMBNAIL_FILE_PATTERN.match(name)
+        if match and match.group(1) not in used:
+            os.remove(os.path.join(directory, name))
+
+    _write_atomic(index_path, json.dumps(index, indent=1, sort_keys=True).encode('utf-8'))
+    print(f'Thumbnails ready for {len(index)} of {len(urls)} images')
+
+    return {url: entry['hash'] for url, entry in index.items()}
+
+def _thumbnail(directory, url, entry):
+    '''Bring one image's thumbnails up to date, returning its new index entry or None.'''
+    # Only trust the old entry if its files are still there
+    if not (entry.get('hash') and _has_thumbnails(directory, entry['hash'])):
+        entry = {}
+
+    headers = {}
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+
+    try:
+        response = transport.get(url, headers=headers)
+        if response.status_code == 304 and entry:
+            return entry
+        response.raise_for_status()
+    except requests.RequestException as e:
+        # Keep serving the last thumbnails rather than dropping them on a bad day
+        print(f'Could not download image {url}: {e}')
+        return entry or None
+
+    image_hash = hashlib.sha256(response.content).hexdigest()[:16]
+    if not _has_thumbnails(directory, image_hash):
+        try:
+            write_thumbnails(directory, image_hash, response.content)
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            # Not an image, e.g. a sign-in page in place of a Drive photo
+            print(f'Could not make thumbnails of {url}: {e}')
+            return None
+
+    return {
+        'hash': image_hash,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+
+def write_thumbnails(directory, image_hash, content):
+    '''Write every size and format of thumbnail for one image.'''
+    with Image.open(io.BytesIO(content)) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+        for width, height in THUMBNAIL_SIZES:
+            thumbnail = ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+            for extension, image_format in THUMBNAIL_FORMATS.items():
+                output = io.BytesIO()
+                thumbnail.save(output, image_format, quality=80, optimize=True)
+                _write_atomic(os.path.join(directory, f'{image_hash}-{width}.{extension}'), output.getvalue())
+
+def _has_thumbnails(directory, image_hash):
+    return all(
+        os.path.exists(os.path.join(directory, f'{image_hash}-{width}.{extension}'))
+        for width, _ in THUMBNAIL_SIZES
+        for extension in THUMBNAIL_FORMATS
+    )
+
+def _load_index(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_atomic(path, content):
+    # Two urls can share an image, so each thread writes its own temp file
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_CONNECT_TIMEOUT = 5 # seconds
+DEFAULT_READ_TIMEOUT = 30 # seconds
+POOL_SIZE = 10 # Connections kept open per host, enough for the thumbnail workers
+
+# One session per host for the whole run, shared by every rescue
+_sessions = {}
+_timings = []
+_lock = threading.Lock()
+
+def get_session(url):
+    '''
+    Return the shared session for a url's host.
+
+    Each session keeps its connections to the host alive between requests, so only the first
+    request pays for the TCP and TLS handshake. Requests' default headers already ask for
+    gzip/deflate compressed responses.
+    '''
+    host = urlsplit(url).netloc
+
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[host] = session
+        return session
+
+def default_timeout():
+    '''(connect, read) seconds from SCRAPER_HTTP_CONNECT_TIMEOUT and SCRAPER_HTTP_READ_TIMEOUT.'''
+    return (
+        float(os.getenv('SCRAPER_HTTP_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT)),
+        float(os.getenv('SCRAPER_HTTP_READ_TIMEOUT', DEFAULT_READ_TIMEOUT)),
+    )
+
+def request(method, url, timeout=None, **kwargs):
+    '''
+    Send a request through the host's shared session.
+
+    Every request gets the same connect and read timeouts (SCRAPER_HTTP_CONNECT_TIMEOUT and
+    SCRAPER_HTTP_READ_TIMEOUT, default 5 and 30 seconds) unless timeout is given. How long
+    each one took, body included, and its size are kept for summary() and host_stats().
+
+    Args:
+        method: HTTP method
+        url: Url to request
+        timeout: Optional timeout in seconds, or a (connect, read) pair
+        **kwargs: Anything else requests.Session.request takes, e.g. params, headers, json
+
+    Returns:
+        requests.Response: The response, not checked for an error status
+    '''
+    if timeout is None:
+        timeout = default_timeout()
+
+    start = time.monotonic()
+    status = None
+    size = 0
+    try:
+        response = get_session(url).request(method, url, timeout=timeout, **kwargs)
+        status = response.status_code
+        size = len(response.content)
+        return response
+    finally:
+        with _lock:
+            _timings.append({
+                'method': method,
+                'host': urlsplit(url).netloc,
+                'status': status,
+                'bytes': size,
+                'seconds': time.monotonic() - start,
+            })
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+def host_stats():
+    '''
+    Totals of the requests made this run, by host.
+
+    Returns:
+        dict: Host -> 'requests', 'seconds', 'bytes' received and 'failed' to connect
+    '''
+    with _lock:
+        timings = list(_timings)
+
+    hosts = {}
+    for timing in timings:
+        stats = hosts.setdefault(timing['host'], {'requests': 0, 'seconds': 0.0, 'bytes': 0, 'failed': 0})
+        stats['requests'] += 1
+        stats['seconds'] += timing['seconds']
+        stats['bytes'] += timing['bytes']
+        stats['failed'] += timing['status'] is None
+    return hosts
+
+def summary():
+    '''One line on the requests made this run, or None if there were none.'''
+    hosts = host_stats()
+    if not hosts:
+        return None
+
+    slowest_host = max(hosts, key=lambda host: hosts[host]['seconds'])
+    requests_made = sum(stats['requests'] for stats in hosts.values())
+    seconds = sum(stats['seconds'] for stats in hosts.values())
+    failed = sum(stats['failed'] for stats in hosts.values())
+
+    return (f'HTTP: {requests_made} requests to {len(hosts)} hosts in {seconds:.1f}s, '
+            f'most time on {slowest_host} ({hosts[slowest_host]["seconds"]:.1f}s), {failed} failed to connect')